@@ -2,49 +2,195 @@ from __future__ import annotations
 from player import Player, Goal
 from grid import HexGrid
 from random import choice
-from pygame import Vector2, Vector3, time, Color, math
+from pygame import Vector2, time, Color
 from abc import ABC, abstractmethod
 from collections import deque
-from queue import PriorityQueue
+from copy import copy
+from array import array
+from time import perf_counter
+from datetime import datetime
+import os
+from search import Node, SearchEngine, SearchObserver
+from incremental import LPAStarEngine
+from bidirectional import BidirectionalEngine
+from jps import JumpPointEngine
+from path_cache import PathCache
+from trace_file import CLOSED, FOUND, MARK_BACKWARD, OPEN, TraceWriter
+
+# strategies that need something other than SearchEngine
+ENGINES = {"lpastar": LPAStarEngine, "biBfs": BidirectionalEngine,
+           "biAstar": BidirectionalEngine, "jps": JumpPointEngine}
+# the incremental engine keeps changing its tree after it finishes
+UNCACHED = {"lpastar"}
 
 class Agent(ABC):
+    # finished searches, shared by every agent so a restart with the same
+    # map, start, goal and strategy is drawn straight from the cache
+    cache = PathCache()
+    # searches are written to binary trace files here when set, see
+    # trace_file. Recorded searches always run rather than come from cache
+    trace_dir = None
+    # colour of each trace_file mark, set by agents that draw their search
+    MARK_COLOURS: dict = {}
+
     def __init__(self, player: Player, goal: Goal, grid: HexGrid,
-                 selected: str) -> None:
+                 selected: str, frontier: str="heap") -> None:
         super().__init__()
         self.player = player
         self.goal = goal
         self.grid = grid
         self.selected = selected
+        self.frontier = frontier
         self.trail = 0
+        self.writer: TraceWriter = None
 
         self.reset()
 
     def reset(self) -> None:
         self.player.reset_trail(self.grid.pos_to_coords(self.player.pos))
+        self.path_index = 0
+        self.active = True
 
+        self.close_trace()
+        # the mark last painted on each cell and the cells painted so far,
+        # kept so a cached search is redrawn in one pass per colour
+        self.marks = bytearray(int(self.grid.get_size()))
+        self.painted = array('i')
+        self.cache_key = None
+        if self.selected not in UNCACHED and self.trace_dir is None:
+            self.cache_key = (self.grid.version, self.grid.pos_to_id(self.player.pos),
+                              self.grid.pos_to_id(self.goal.pos), self.selected, self.frontier)
+            cached = self.cache.get(self.cache_key)
+            if cached is not None:
+                self.restore(*cached)
+                return
+
+        engine = ENGINES.get(self.selected, SearchEngine)
+        self.engine = engine(self.grid, self.player.pos, self.goal.pos,
+                             self.selected, self.open_trace(), self.frontier)
+        self.grid.search_trees = self.engine.trees
+
+    def restore(self, engine, highlights: dict[int, array]) -> None:
+        # copies so nothing this agent does later reaches the cached engine
+        self.engine = copy(engine)
+        self.engine.closed = copy(engine.closed)
+        self.engine.path = engine.path.copy()
+        self.engine.tree = engine.tree.copy()
+        if hasattr(engine, "backward_tree"):
+            self.engine.backward_tree = engine.backward_tree.copy()
+        self.engine.observer = self
+        # the entry may come from another grid with the same map, a later
+        # reset_open or move_goal has to search this one
+        self.engine.grid = self.grid
+        self.grid.search_trees = self.engine.trees
+        self.cache_key = None
+        for mark, cell_ids in highlights.items():
+            self.grid.set_highlights(cell_ids, self.MARK_COLOURS[mark])
+
+    def trace_path(self) -> str:
+        os.makedirs(self.trace_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        return os.path.join(self.trace_dir, f"{stamp}-{self.selected}.pftrace")
+
+    def open_trace(self) -> SearchObserver:
+        # a trace holds one search from reset() on an unchanged map, moving
+        # the start or goal or editing a wall ends it early
+        self.close_trace()
+        if self.trace_dir is None:
+            return self
+        self.writer = TraceWriter(self.grid, self.trace_path(), self.player.pos,
+                                  self.goal.pos, self.selected, self)
+        return self.writer
+
+    def close_trace(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def store_result(self) -> None:
+        self.close_trace()
+        # only searches that ran start to finish on one map are kept
+        if self.cache_key is None or self.cache_key[0] != self.grid.version:
+            return
+        engine = copy(self.engine)
+        engine.closed = copy(self.engine.closed)
+        engine.path = self.engine.path.copy()
+        engine.tree = self.engine.tree.copy()
+        if hasattr(engine, "backward_tree"):
+            engine.backward_tree = self.engine.backward_tree.copy()
+        highlights: dict[int, array] = {}
+        for cell_id in self.painted:
+            highlights.setdefault(self.marks[cell_id], array('i')).append(cell_id)
+        self.cache.put(self.cache_key, (engine, highlights))
+        self.cache_key = None
+
+    def highlight(self, pos, mark: int) -> None:
+        cell_id = self.grid.pos_to_id(pos)
+        if not self.marks[cell_id]:
+            self.painted.append(cell_id)
+        self.marks[cell_id] = mark
+        self.grid.set_highlight(pos, self.MARK_COLOURS[mark])
 
-        self.closed: deque[Node] = deque()
-        self.current: Node = None
-        self.path: deque[Node] = deque()
-
-        self.has_goal = False
+    def reset_open(self):
+        self.cache_key = None
+        self.close_trace()
+        self.engine.reset_open(self.player.pos, self.goal.pos)
+
+    def cell_changed(self, pos) -> None:
+        # call after pos was turned into a wall or floor
+        self.cache_key = None
+        self.close_trace()
+        self.engine.cell_changed(self.grid.pos_to_id(pos))
+        self.replan()
+
+    def move_goal(self) -> None:
+        self.cache_key = None
+        self.close_trace()
+        self.engine.move_goal(self.player.pos, self.goal.pos)
+        self.replan()
+
+    def replan(self) -> None:
+        # an incremental engine reopens a finished search when an edit
+        # affects it, walk the new path from the start again
+        if self.engine.finished:
+            return
+        if self.path_index > 0:
+            self.player.pos = self.engine.start
+            self.player.reset_trail(self.grid.pos_to_coords(self.player.pos))
         self.path_index = 0
-        self.iteration = 0
-        self.priority_index = 1
         self.active = True
 
-        self.reset_open()
+    # search state lives on the engine, these keep the old attribute names
+    # that the controllers read
+    @property
+    def open(self):
+        return self.engine.open
 
-    def reset_open(self):
-        self.open: PriorityQueue[Node] = PriorityQueue()
-        estimated_cost = self.grid.estimate_remaining_cost(
-            self.goal.pos, self.player.pos)
-        self.open.put(Node(self.player.pos, None, 0, estimated_cost, 0, 5, self.selected))
+    @property
+    def closed(self) -> deque[Node]:
+        return self.engine.closed
+
+    @property
+    def current(self) -> Node:
+        return self.engine.current
+
+    @property
+    def path(self) -> deque[Node]:
+        return self.engine.path
+
+    @property
+    def has_goal(self) -> bool:
+        return self.engine.has_goal
+
+    @property
+    def iteration(self) -> int:
+        return self.engine.expansions
 
     def randomise_start_and_end(self, is_random) -> None:
         if is_random:
+            # the start is always picked where it can reach the goal
             self.goal.pos = self.grid.random_pos()
-            self.player.pos = self.grid.random_pos()
+            self.player.pos = self.grid.random_connected_pos(self.goal.pos)
         else:
             self.player.pos = self.grid.coords_to_pos(self.player.trail[0])
 
@@ -57,11 +203,13 @@ class Agent(ABC):
         return efficiency
 
     def draw_current_trail(self, screen):
-        current = self.current
         self.trail_counter = 1
-        while current is not None and self.has_goal is not True:
-            self.grid.draw_trail(screen, current.pos)
-            current = current.parent
+        if self.current is None or self.has_goal:
+            return
+        # the tree of the half the node came from, for a bidirectional search
+        tree = self.engine.trees[getattr(self.current, "backward", False)]
+        for cell_id in tree.path_ids(self.grid.pos_to_id(self.current.pos)):
+            self.grid.draw_trail(screen, self.grid.id_to_pos(cell_id))
             self.trail_counter += 1
 
     @abstractmethod
@@ -93,151 +241,71 @@ class RandomAgent(Agent):
     def is_ready(self):
         return time.get_ticks() > self.interval + self.time
 
-class Node:
-    def __init__(self, pos: math._GenericVector,  parent: Node,
-                 global_cost: float, estimated_cost: float=0,
-                 priority: int=0, limit=0, selected: str="astar") -> None:
-        self.pos = pos
-        self.parent = parent
-
-        self.global_cost = global_cost
-        self.estimated_cost = estimated_cost
-        self.total_cost = global_cost + estimated_cost
-
-        self.priority = priority
-        self.options = {"dfs": self.dfs, "bfs": self.bfs,
-                        "astar": self.astar, "bestFirst": self.bestFirst,
-                        "iterative":self.iterative_deepning}
-        self.selected = selected
-        self.limit = limit
-        if self.parent is not None:
-            if (self.limit < self.parent.limit):
-                self.limit = self.parent.limit
-            if (self.global_cost > self.parent.limit):
-                self.limit += limit
-
-
-    def update_costs(self, parent: Node, global_cost: float):
-        self.global_cost = global_cost
-        self.total_cost = global_cost + self.estimated_cost
-        self.parent = parent
-
-    def __lt__(self, other):
-        return self.options[self.selected](other)
-
-    def astar(self, other):
-        if self.total_cost == other.total_cost:
-            if self.global_cost == other.global_cost:
-                return self.priority > other.priority
-            return self.global_cost < other.global_cost
-        return self.total_cost < other.total_cost
+class AStar(Agent, SearchObserver):
+    OPEN_COLOUR = Color(168, 0, 168)
+    CLOSED_COLOUR = Color('blue')
+    # the goal side of a bidirectional search
+    BACKWARD_OPEN_COLOUR = Color(200, 160, 0)
+    BACKWARD_CLOSED_COLOUR = Color(130, 70, 0)
+    MARK_COLOURS = {OPEN: OPEN_COLOUR, CLOSED: CLOSED_COLOUR,
+                    OPEN | MARK_BACKWARD: BACKWARD_OPEN_COLOUR,
+                    CLOSED | MARK_BACKWARD: BACKWARD_CLOSED_COLOUR,
+                    FOUND: Color('Green')}
 
-    def bfs(self, other):
-        return self.priority < other.priority
-
-    def dfs(self, other):
-        return self.priority > other.priority
-
-    def bestFirst(self, other):
-        if self.estimated_cost == other.estimated_cost:
-            return self.priority > other.priority
-            # return self.global_cost > other.global_cost
-        return self.estimated_cost < other.estimated_cost
-
-    def iterative_deepning(self, other):
-
-        if self.limit != other.limit:
-            # return self.priority < other.priority
-            return self.limit < other.limit
-        return self.priority > other.priority
-
-
-
-
-
-
-class AStar(Agent):
-    def __init__(self, player, goal: Goal, grid, selected) -> None:
-        super().__init__(player, goal, grid, selected)
+    def __init__(self, player, goal: Goal, grid, selected, frontier="heap") -> None:
+        super().__init__(player, goal, grid, selected, frontier)
 
     def draw(self):
         self.player.draw(self.grid.pos_to_coords(self.player.pos))
         self.goal.draw(self.grid.pos_to_coords(self.goal.pos))
 
     def get_neighbours(self):
-        adjacents = self.grid.get_neighbours(self.current.pos)
-
-        closed_positions = [c.pos for c in self.closed]
-        opened_positions = dict()
-        for o in self.open.queue:
-            opened_positions[tuple(o.pos)] = o
-
-        for adjacent in adjacents:
-            global_cost = self.current.global_cost + self.grid.estimate_remaining_cost(adjacent, self.current.pos)
-            if adjacent not in closed_positions:
-
-
-                if tuple(adjacent) in opened_positions.keys():
-                    # get node
-                    old_node = opened_positions[tuple(adjacent)]
-                    if old_node.global_cost > global_cost:
-                        old_node.update_costs(
-                        self.current, global_cost)
-                        self.grid.set_parent(adjacent, self.current.pos)
-                else:
-                    estimated_remaining_cost = self.grid.estimate_remaining_cost(self.goal.pos, adjacent)
-                    node = Node(adjacent, self.current, global_cost,
-                                estimated_remaining_cost, self.priority_index,
-                                10, self.selected)
-                    self.priority_index += 1
-                    self.open.put(node)
-                    self.grid.set_highlight(adjacent)
-                    self.grid.set_parent(adjacent, self.current.pos)
-
-    def update(self):
+        self.engine.expand(self.current)
+
+    # search events from the engine
+    def on_push(self, node: Node) -> None:
+        if getattr(node, "backward", False):
+            self.highlight(node.pos, OPEN | MARK_BACKWARD)
+        else:
+            self.highlight(node.pos, OPEN)
+
+    def on_expand(self, node: Node) -> None:
+        if self.open.qsize() > 0:
+            if getattr(node, "backward", False):
+                self.highlight(node.pos, CLOSED | MARK_BACKWARD)
+            else:
+                self.highlight(node.pos, CLOSED)
+
+    def on_goal(self, node: Node) -> None:
+        self.highlight(node.pos, FOUND)
+
+    def on_exhausted(self) -> None:
+        if self.grid.get_cell(self.player.pos) is not None:
+            self.highlight(self.player.pos, CLOSED)
+
+    def update(self, steps=1, deadline=None):
+        # expands up to steps nodes per call, or every node until the goal
+        # when steps is None. deadline is a perf_counter() time after which
+        # no more steps are started, at least one step always runs
         if not self.active:
             return False
 
         # if we haven't found goal,
         if not self.has_goal:
-
-            # if there are no more open nodes end program
-            if self.open.qsize() == 0:
-                self.current = None
-                self.active = False
-                pos = self.grid.get_cell(self.player.pos)
-                if pos is not None:
-                    pos.colour = Color('blue')
-                return False
-            self.current = self.open.get()
-
-            self.iteration+=1
-
-            self.get_neighbours()
-
-            # self.grid.set_highlight(self.open.queue[0].pos, Color(240,0,240))
-            if self.open.qsize() > 0:
-                self.grid.set_highlight(self.current.pos, Color('blue'))
-
-            if self.current.pos == self.goal.pos:
-                self.grid.set_highlight(self.current.pos)
-                self.has_goal = True
-                pos = self.grid.get_cell(self.current.pos)
-                # if pos is not None:
-                pos.colour = Color('orange')
-
-                current = self.current
-                while current.parent is not None:
-                    self.path.append(current)
-                    current = current.parent
-
-                self.path.reverse()
-                pos = self.grid.get_cell(self.current.pos)
-                if pos is not None:
-                    pos.colour = Color('Green')
-
-            self.closed.append(self.current)
-            self.open.task_done()
+            step = 0
+            while True:
+                if not self.engine.step():
+                    self.store_result()
+                    self.active = False
+                    return False
+                step += 1
+                if self.has_goal:
+                    self.store_result()
+                    break
+                if step == steps:
+                    break
+                if deadline is not None and perf_counter() >= deadline:
+                    break
         # Move Player
         elif self.path_index < len(self.path):
             pos = self.path[self.path_index].pos
@@ -247,4 +315,3 @@ class AStar(Agent):
             self.active = False
             return False
         return True
-
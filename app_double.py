@@ -1,6 +1,6 @@
 # Example file showing a circle moving on screen
 import pygame as pg
-from grid import HexGrid
+from array_grid import ArrayHexGrid
 from gameController import GameController
 from mainController import mainController
 
@@ -14,7 +14,7 @@ size = 30
 # dimensions = pg.Vector2(60, 75)
 dimensions = pg.Vector2(21, 22)
 grid_pos = CENTER-pg.Vector2(17*15, 0)
-grid = HexGrid(dimensions, grid_pos, size=size)
+grid = ArrayHexGrid(dimensions, grid_pos, size=size)
 # create walls
 goal_pos = grid.random_pos()
 wall_num = int(grid.get_size()*0.2)
@@ -23,13 +23,14 @@ controller = GameController(screen, grid, goal_pos, "bestFirst",
                             wait_time=2500, wall_num=wall_num)
 
 grid_pos = CENTER+pg.Vector2(17*15, 0)
-grid2 = HexGrid(dimensions, grid_pos, size=size)
-grid2.cells = [cell.copy() if cell is not None else None for cell in grid.cells]
+# both panes show one shared map, each keeps its own colours
+grid2 = ArrayHexGrid(dimensions, grid_pos, size=size)
+grid2.share_map(grid)
 controller2 = GameController(screen, grid2, goal_pos, "astar",
                              is_random_start=True, change_agent_type=False,
                              wait_time=2500, wall_num=wall_num)
 
-controller2.grid.cells = controller.grid.copy()
+controller2.grid.share_map(controller.grid)
 controller2.agent.reset_open()
 
 font = pg.font.SysFont('Consolas', 16)
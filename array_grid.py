@@ -0,0 +1,255 @@
+from __future__ import annotations
+from array import array
+import numpy as np
+from random import randint, getrandbits
+from pygame import Color, Vector3, draw
+from grid import Adjacency, Components, HexGrid, MAP_VERSIONS
+from sq_grid import SquareGrid
+from mapgen import sample_walls
+
+
+def pack_rows(table: np.ndarray, keep: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # moves the kept entries of each row to its front in order, the rest
+    # become -1. Returns the packed table and the kept count of each row
+    order = np.argsort(~keep, axis=1, kind="stable")
+    packed = np.take_along_axis(np.where(keep, table, -1), order, axis=1)
+    return packed.astype(np.int32), keep.sum(axis=1)
+
+
+class SharedMap:
+    # walls and the neighbour table, shared by every grid showing the same
+    # map. While more than one grid holds a map it is never changed,
+    # edit() returns a new one and the others stay on the old map until
+    # they share again. A map only one grid holds is patched in place
+    def __init__(self, passable: np.ndarray, adjacency: Adjacency=None,
+                 components: Components=None) -> None:
+        passable.flags.writeable = False
+        self.passable = passable
+        self.adjacency = adjacency
+        self.components = components
+        self.version = next(MAP_VERSIONS)
+        # CellArrays holding this map, kept by CellArrays.map. One that is
+        # dropped without letting go only costs an extra copy on the next
+        # edit, the copy has a single owner again
+        self.owners = 0
+
+    def edit(self, cell_ids, passable: bool) -> SharedMap:
+        if np.ndim(cell_ids) == 0 and self.owners <= 1:
+            self.patch(int(cell_ids), passable)
+            return self
+        cells = self.passable.copy()
+        cells[cell_ids] = passable
+        adjacency = components = None
+        if self.adjacency is not None and np.ndim(cell_ids) == 0:
+            # one cell, cheaper to patch a copy than to build a new table
+            adjacency = self.adjacency.copy(list(self.adjacency.passable))
+            adjacency.set_passable(int(cell_ids), passable)
+            if self.components is not None:
+                components = self.components.copy()
+                components.set_passable(int(cell_ids), passable, adjacency)
+        return SharedMap(cells, adjacency, components)
+
+    def patch(self, cell_id: int, passable: bool) -> None:
+        # nobody else can see the map, so it changes in place like the
+        # object grids do, with a new version
+        self.passable.flags.writeable = True
+        self.passable[cell_id] = passable
+        self.passable.flags.writeable = False
+        if self.adjacency is not None:
+            self.adjacency.set_passable(cell_id, passable)
+            if self.components is not None:
+                self.components.set_passable(cell_id, passable, self.adjacency)
+        else:
+            self.components = None
+        self.version = next(MAP_VERSIONS)
+
+
+class CellArrays:
+    # per cell state in flat arrays indexed by cell id. The walls live in a
+    # SharedMap, colour is this grid's own, parents are in the agent's
+    # search.SearchTree
+    def __init__(self, size: int, colour: Color, shared: SharedMap=None) -> None:
+        self._map = None
+        self.map = shared if shared is not None else SharedMap(np.ones(size, dtype=np.bool_))
+        self.colour = np.empty((size, 4), dtype=np.uint8)
+        self.colour[:] = tuple(colour)
+
+    @property
+    def map(self) -> SharedMap:
+        return self._map
+
+    @map.setter
+    def map(self, shared: SharedMap) -> None:
+        if shared is self._map:
+            return
+        if self._map is not None:
+            self._map.owners -= 1
+        shared.owners += 1
+        self._map = shared
+
+    @property
+    def passable(self) -> np.ndarray:
+        # read only, walls change through ArrayGrid.set_passable
+        return self.map.passable
+
+    def copy(self) -> CellArrays:
+        # the map is shared rather than copied
+        cells = CellArrays.__new__(CellArrays)
+        cells._map = None
+        cells.map = self.map
+        cells.colour = self.colour.copy()
+        return cells
+
+    def nbytes(self) -> int:
+        return self.passable.nbytes + self.colour.nbytes
+
+
+class ArrayGrid:
+    # storage for Grid subclasses, replaces the list of Hex/Cell objects in
+    # self.cells with a CellArrays. Geometry still comes from the grid class,
+    # so it must be listed before HexGrid/SquareGrid in the bases
+    def generate_cells(self):
+        self.cells = CellArrays(int(self.get_size()), self.colour)
+        self.version = self.cells.map.version
+
+    def generate_walls(self, number_of_walls, goal_pos, player_pos=Vector3(0,0,0)):
+        candidates = self.cells.passable.copy()
+        for pos in (goal_pos, player_pos):
+            if self.is_valid_pos(pos):
+                candidates[self.pos_to_id(pos)] = False
+        self.set_walls(sample_walls(candidates, number_of_walls, getrandbits(32)))
+
+    def set_walls(self, cell_ids) -> None:
+        self.cells.map = self.cells.map.edit(np.asarray(cell_ids, dtype=np.intp), False)
+        self.version = self.cells.map.version
+        self.layer = None
+
+    def load_map(self, passable) -> None:
+        self.cells.map = SharedMap(np.array(passable, dtype=np.bool_))
+        self.version = self.cells.map.version
+        self.layer = None
+
+    def share_map(self, other: ArrayGrid) -> None:
+        # both grids point at one SharedMap, only the search state is reset
+        self.cells.map = other.cells.map
+        self.version = self.cells.map.version
+        self.reset()
+
+    def get_adjacency(self) -> Adjacency:
+        shared = self.cells.map
+        if shared.adjacency is None:
+            shared.adjacency = self.build_adjacency()
+        return shared.adjacency
+
+    def build_adjacency(self) -> Adjacency:
+        # the rows of every cell at once rather than one cell at a time
+        geometric = self.get_geometric()
+        table = np.frombuffer(geometric, dtype=np.int32).reshape(-1, self.MAX_NEIGHBOURS)
+        passable = self.cells.passable
+        # -1 indexes the last cell, it is masked out by the first test
+        ids, count = pack_rows(table, (table >= 0) & passable[table])
+        return Adjacency(geometric, passable.tolist(), self.MAX_NEIGHBOURS,
+                         array('i', ids.tobytes()), array('i', count.astype(np.int32).tobytes()))
+
+    def build_geometric(self) -> array:
+        columns, rows = int(self.cell_num.x), int(self.cell_num.y)
+        column, row = np.divmod(np.arange(columns * rows), rows)
+        table = np.full((columns * rows, self.MAX_NEIGHBOURS), -1, dtype=np.int32)
+        inside = np.zeros(table.shape, dtype=np.bool_)
+        for k, (i, j) in enumerate(self.OFFSETS):
+            q = column + i
+            index_row = self.neighbour_row(column, row, i, j)
+            inside[:, k] = (q >= 0) & (q < columns) & (index_row >= 0) & (index_row < rows)
+            table[:, k] = q * rows + index_row
+        geometric, _ = pack_rows(table, inside)
+        return array('i', geometric.tobytes())
+
+    def get_components(self) -> Components:
+        shared = self.cells.map
+        if shared.components is None:
+            shared.components = Components(self.get_adjacency())
+        return shared.components
+
+    def set_passable(self, cell_id: int, passable: bool) -> None:
+        # copy on write, grids sharing the old map keep it
+        self.cells.map = self.cells.map.edit(cell_id, passable)
+        self.version = self.cells.map.version
+        self.dirty.add(cell_id)
+        self.dirty.update(self.geometric_neighbours(*divmod(cell_id, int(self.cell_num.y))))
+
+    def reset(self):
+        self.cells.colour[:] = tuple(self.colour)
+        self.layer = None
+
+    def copy(self) -> CellArrays:
+        return self.cells.copy()
+
+    def set_highlight(self, pos, colour = Color(168,0,168)):
+        if self.is_valid_pos(pos) and self.get_cell(pos) is not None:
+            cell_id = self.pos_to_id(pos)
+            self.cells.colour[cell_id] = tuple(colour)
+            self.dirty.add(cell_id)
+        else:
+            print("not valid", pos)
+
+    def set_highlights(self, cell_ids, colour: Color) -> None:
+        cell_ids = np.asarray(cell_ids, dtype=np.intp)
+        cell_ids = cell_ids[self.cells.passable[cell_ids]]
+        self.cells.colour[cell_ids] = tuple(colour)
+        # a missing layer is repainted in full anyway
+        if self.layer is not None:
+            self.dirty.update(cell_ids.tolist())
+
+    def get_colour(self, pos) -> Color:
+        return Color(*self.cells.colour[self.pos_to_id(pos)].tolist())
+
+    def random_pos(self):
+        passable = np.flatnonzero(self.cells.passable)
+        return self.id_to_pos(int(passable[randint(0, len(passable) - 1)]))
+
+    def random_connected_pos(self, pos):
+        labels = np.frombuffer(self.get_components().labels, dtype=np.int32)
+        label = labels[self.pos_to_id(pos)]
+        if label < 0:
+            return self.random_pos()
+        cells = np.flatnonzero(labels == label)
+        return self.id_to_pos(int(cells[randint(0, len(cells) - 1)]))
+
+    def get_cell(self, pos):
+        # the position itself stands in for the cell object, None for walls
+        cell_id = self.pos_to_id(pos)
+        if self.cells.passable[cell_id]:
+            return self.id_to_pos(cell_id)
+        return None
+
+    def get_passable(self) -> list[bool]:
+        return self.cells.passable.tolist()
+
+    def clear_cell(self, pos):
+        self.set_passable(self.pos_to_id(pos), False)
+
+    def new_cell(self, pos):
+        cell_id = self.pos_to_id(pos)
+        self.set_passable(cell_id, True)
+        self.cells.colour[cell_id] = tuple(self.colour)
+
+    def get_cell_colour(self, cell_id: int) -> Color:
+        if not self.cells.passable[cell_id]:
+            return None
+        return Color(*self.cells.colour[cell_id].tolist())
+
+    def draw_overlay(self, screen) -> None:
+        for tree in self.search_trees:
+            parents = np.frombuffer(tree.parent, dtype=np.int32)
+            for cell_id in np.flatnonzero(parents >= 0):
+                start_pos = self.centres[cell_id]
+                end_pos = self.centres[parents[cell_id]]
+                draw.line(screen, (255, 255, 255), start_pos, end_pos)
+
+
+class ArrayHexGrid(ArrayGrid, HexGrid):
+    pass
+
+
+class ArraySquareGrid(ArrayGrid, SquareGrid):
+    pass
@@ -0,0 +1,168 @@
+"""Runs many pathfinding scenarios across a process pool
+
+    python batch.py --count 1000 --sizes 40 --densities 0.2 0.4 --output runs.csv
+    python batch.py --load scenarios.jsonl --output runs.jsonl
+
+Each scenario is a map, start and goal built from a seed (see scenarios.py).
+A loaded scenario is one JSON object per line with grid, width, height,
+density and seed, plus optional walls, start and goal as cell ids to pin
+the map down exactly. Every strategy is run on every scenario and a row per
+run is written as results come back, CSV or JSONL going by the extension.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from scenarios import GRID_TYPES, STRATEGIES, make_grid, make_scenario
+from search import FRONTIER_TYPES, SearchEngine
+
+FIELDS = ["scenario", "grid", "width", "height", "density", "seed", "strategy",
+          "found", "expansions", "pushes", "path_length", "path_cost",
+          "efficiency", "wall_time"]
+
+
+def build_scenario(scenario: dict):
+    if "walls" not in scenario:
+        return make_scenario(scenario["grid"], scenario["width"], scenario["height"],
+                             scenario["density"], scenario["seed"])
+    grid = make_grid(scenario["grid"], scenario["width"], scenario["height"])
+    for cell_id in scenario["walls"]:
+        grid.clear_cell(grid.id_to_pos(cell_id))
+    return grid, grid.id_to_pos(scenario["start"]), grid.id_to_pos(scenario["goal"])
+
+
+def run_scenario(job: tuple) -> list[dict]:
+    # runs in a worker process, the map is built once and shared by every
+    # strategy
+    index, scenario, strategies, frontier = job
+    grid, start, goal = build_scenario(scenario)
+    rows = []
+    for strategy in strategies:
+        engine = SearchEngine(grid, start, goal, strategy, frontier=frontier)
+        started = time.perf_counter()
+        result = engine.run()
+        rows.append({
+            "scenario": index,
+            "grid": scenario["grid"], "width": scenario["width"],
+            "height": scenario["height"], "density": scenario.get("density"),
+            "seed": scenario.get("seed"), "strategy": strategy,
+            "found": result.found,
+            "expansions": result.expansions,
+            "pushes": result.pushes,
+            "path_length": len(result.path),
+            "path_cost": result.path_cost,
+            "efficiency": result.get_efficiency(),
+            "wall_time": time.perf_counter() - started,
+        })
+    return rows
+
+
+def generate_scenarios(args):
+    index = 0
+    while index < args.count:
+        for kind in args.grids:
+            for size in args.sizes:
+                for density in args.densities:
+                    if index == args.count:
+                        return
+                    yield {"grid": kind, "width": size, "height": size,
+                           "density": density, "seed": args.seed + index}
+                    index += 1
+
+
+def load_scenarios(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ResultWriter:
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "w", newline="")
+        self.is_csv = not path.endswith(".jsonl")
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.file, FIELDS)
+            self.writer.writeheader()
+
+    def write(self, rows: list[dict]) -> None:
+        for row in rows:
+            if self.is_csv:
+                self.writer.writerow(row)
+            else:
+                self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class Summary:
+    def __init__(self) -> None:
+        self.totals: dict[str, dict] = {}
+
+    def add(self, rows: list[dict]) -> None:
+        for row in rows:
+            total = self.totals.setdefault(row["strategy"], {
+                "runs": 0, "found": 0, "expansions": 0, "efficiency": 0, "wall_time": 0})
+            total["runs"] += 1
+            total["found"] += row["found"]
+            total["expansions"] += row["expansions"]
+            total["efficiency"] += row["efficiency"]
+            total["wall_time"] += row["wall_time"]
+
+    def print(self, elapsed: float) -> None:
+        print(f"{'strategy':<10} {'runs':>7} {'found':>7} {'expansions':>11} "
+              f"{'efficiency':>10} {'ms/run':>8}")
+        runs = 0
+        for strategy, total in self.totals.items():
+            n = total["runs"]
+            runs += n
+            print(f"{strategy:<10} {n:>7} {total['found']/n:>7.1%} "
+                  f"{total['expansions']/n:>11.1f} {total['efficiency']/n:>10.3%} "
+                  f"{total['wall_time']/n*1000:>8.2f}")
+        print(f"{runs} runs in {elapsed:.2f}s, {runs/elapsed:.0f} runs/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--load", help="JSONL file of scenarios instead of generating them")
+    parser.add_argument("--count", type=int, default=100, help="number of scenarios to generate")
+    parser.add_argument("--grids", nargs="+", default=list(GRID_TYPES), choices=GRID_TYPES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[40])
+    parser.add_argument("--densities", nargs="+", type=float, default=[0.2])
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first generated scenario")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=STRATEGIES)
+    parser.add_argument("--frontier", default="heap", choices=FRONTIER_TYPES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunksize", type=int, default=4)
+    parser.add_argument("--output", default="batch_results.csv")
+    args = parser.parse_args()
+
+    scenarios = load_scenarios(args.load) if args.load else generate_scenarios(args)
+    jobs = ((index, scenario, args.strategies, args.frontier)
+            for index, scenario in enumerate(scenarios))
+
+    writer = ResultWriter(args.output)
+    summary = Summary()
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(args.workers) as executor:
+            for rows in executor.map(run_scenario, jobs, chunksize=args.chunksize):
+                writer.write(rows)
+                summary.add(rows)
+    finally:
+        writer.close()
+    summary.print(time.perf_counter() - started)
+    print(f"wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Benchmarks every strategy on seeded HexGrid and SquareGrid maps
+
+    python benchmarks/bench_search.py --sizes 25 50 --densities 0.2 0.5
+    python benchmarks/bench_search.py --compare old.json --output new.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scenarios import BACKENDS, GRID_TYPES, STRATEGIES, make_scenario
+from search import FRONTIER_TYPES, SearchEngine
+
+DEFAULT_SIZES = (25, 50, 100, 200, 500)
+# 0.2 is what app.py uses, 0.8 is the cap in GameController.check_keys
+DEFAULT_DENSITIES = (0.2, 0.5, 0.8)
+
+
+def time_search(grid, start, goal, strategy, repeat, frontier):
+    best = None
+    for _ in range(repeat):
+        engine = SearchEngine(grid, start, goal, strategy, frontier=frontier)
+        started = time.perf_counter()
+        result = engine.run()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best[0]:
+            best = (elapsed, result)
+    return best
+
+
+def peak_memory(grid, start, goal, strategy, frontier):
+    # separate run, tracemalloc slows the search down too much to time it
+    tracemalloc.start()
+    SearchEngine(grid, start, goal, strategy, frontier=frontier).run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def run_benchmarks(args):
+    results = []
+    for kind in args.grids:
+        for size in args.sizes:
+            for density in args.densities:
+                for seed in args.seeds:
+                    grid, start, goal = make_scenario(kind, size, size, density, seed, args.backend)
+                    for strategy in args.strategies:
+                        elapsed, result = time_search(grid, start, goal, strategy, args.repeat, args.frontier)
+                        row = {
+                            "grid": kind, "backend": args.backend, "frontier": args.frontier, "width": size, "height": size,
+                            "density": density, "seed": seed, "strategy": strategy,
+                            "found": result.found,
+                            "expansions": result.expansions,
+                            "pushes": result.pushes,
+                            "path_length": len(result.path),
+                            "path_cost": result.path_cost,
+                            "wall_time": elapsed,
+                            "expansions_per_sec": result.expansions / elapsed if elapsed > 0 else 0,
+                            "peak_memory": None if args.no_memory else peak_memory(grid, start, goal, strategy, args.frontier),
+                        }
+                        results.append(row)
+                        print(f"{kind:<6} {size:>4} {density:>4} {seed:>3} {strategy:<10} "
+                              f"{row['expansions']:>8} exp {elapsed*1000:>10.2f} ms "
+                              f"{row['expansions_per_sec']:>12.0f} exp/s", flush=True)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def run_key(row):
+    return (row["grid"], row.get("backend", "objects"), row.get("frontier", "heap"),
+            row["width"], row["height"], row["density"], row["seed"], row["strategy"])
+
+
+def compare(old_path, results):
+    with open(old_path) as f:
+        old = {run_key(row): row for row in json.load(f)["results"]}
+    print(f"\ncompared with {old_path} (old time / new time)")
+    for row in results:
+        before = old.get(run_key(row))
+        if before is None or row["wall_time"] == 0:
+            continue
+        speedup = before["wall_time"] / row["wall_time"]
+        note = "" if before["expansions"] == row["expansions"] else "  expansions differ"
+        print(f"{row['grid']:<6} {row['width']:>4} {row['density']:>4} {row['seed']:>3} "
+              f"{row['strategy']:<10} {speedup:>6.2f}x{note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--grids", nargs="+", default=list(GRID_TYPES), choices=GRID_TYPES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument("--densities", nargs="+", type=float, default=list(DEFAULT_DENSITIES))
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=STRATEGIES)
+    parser.add_argument("--backend", default="objects", choices=BACKENDS)
+    parser.add_argument("--frontier", default="heap", choices=FRONTIER_TYPES,
+                        help="bucket only applies to astar and bestFirst")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--repeat", type=int, default=1, help="keep the fastest of n runs")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"wrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+from __future__ import annotations
+from collections import deque
+from heapq import merge
+from itertools import islice
+from search import Node, SearchObserver, SearchResult, SearchTree, make_frontier
+
+INFINITY = float("inf")
+# every move costs 1, see search.astar_bucket
+MIN_STEP_COST = 1
+
+# bidirectional strategies and the strategy each half runs
+BIDIRECTIONAL = {"biBfs": "bfs", "biAstar": "astar"}
+
+
+class BidirectionalNode(Node):
+    # backward nodes are searched from the goal towards the start
+    __slots__ = ("backward",)
+
+    def __init__(self, pos, parent, global_cost, estimated_cost=0,
+                 priority=0, limit=0, backward=False) -> None:
+        super().__init__(pos, parent, global_cost, estimated_cost, priority, limit)
+        self.backward = backward
+
+
+class SearchHalf:
+    # one direction of the search. reached holds every node this half has
+    # seen, open or closed, so the other half can look up meeting costs
+    def __init__(self, selected: str, frontier: str, target, backward: bool) -> None:
+        self.open = make_frontier(selected, frontier)
+        self.closed_ids: set[int] = set()
+        self.reached: dict[int, BidirectionalNode] = {}
+        self.target = target
+        self.backward = backward
+
+    def peek(self) -> BidirectionalNode:
+        return self.open.top(1)[0]
+
+
+def merge_key(node: BidirectionalNode):
+    # fifo halves keep no sort key, they come out in order of g
+    return node.global_cost if node.sort_key is None else node.sort_key
+
+
+class BidirectionalFrontier:
+    # read only view over both open lists for the controllers, in priority
+    # order across the two halves
+    def __init__(self, forward: SearchHalf, backward: SearchHalf) -> None:
+        self.forward = forward.open
+        self.backward = backward.open
+
+    def qsize(self) -> int:
+        return self.forward.qsize() + self.backward.qsize()
+
+    def __len__(self) -> int:
+        return self.qsize()
+
+    @property
+    def queue(self) -> list:
+        return self.forward.queue + self.backward.queue
+
+    def ordered(self):
+        # each half is already in order, merging keeps top() at O(k log n)
+        return merge(self.forward.ordered(), self.backward.ordered(), key=merge_key)
+
+    def top(self, count: int, start: int=0) -> list:
+        return list(islice(self.ordered(), start, start + count))
+
+
+class BidirectionalEngine:
+    # grows a bfs or astar search from both the start and the goal, always
+    # expanding the half with the smaller open list, and joins the two
+    # trees at the cheapest cell both have reached. Same interface as
+    # SearchEngine
+    def __init__(self, grid, start, goal, selected: str="biAstar",
+                 observer: SearchObserver=None, frontier: str="heap") -> None:
+        if selected not in BIDIRECTIONAL:
+            raise ValueError(f"unknown strategy {selected!r}, expected one of {tuple(BIDIRECTIONAL)}")
+        self.grid = grid
+        self.selected = selected
+        self.observer = observer
+        self.frontier = frontier
+        self.reset(start, goal)
+
+    def reset(self, start, goal) -> None:
+        # one tree per half, a cell both halves reach has a parent and g
+        # in each. The joins use the nodes
+        self.tree = SearchTree(int(self.grid.get_size()))
+        self.backward_tree = SearchTree(int(self.grid.get_size()))
+        self.closed: deque[Node] = deque()
+        self.expansions = 0
+        self.pushes = 0
+        self.reset_open(start, goal)
+
+    def reset_open(self, start, goal) -> None:
+        self.start = start
+        self.goal = goal
+        self.current: Node = None
+        self.path: deque[Node] = deque()
+        self.has_goal = False
+        self.finished = False
+        self.priority_index = 1
+        # cheapest joined path found so far and the cell where it joins
+        self.best_cost = INFINITY
+        self.meeting_id: int = None
+
+        selected = BIDIRECTIONAL[self.selected]
+        self.forward = SearchHalf(selected, self.frontier, goal, False)
+        self.backward = SearchHalf(selected, self.frontier, start, True)
+        self.open = BidirectionalFrontier(self.forward, self.backward)
+        for half, pos in ((self.forward, start), (self.backward, goal)):
+            node = BidirectionalNode(pos, None, 0, self.grid.estimate_remaining_cost(half.target, pos),
+                                     0, 5, half.backward)
+            self.add_node(half, self.grid.pos_to_id(pos), node, -1)
+
+    @property
+    def trees(self) -> tuple[SearchTree, SearchTree]:
+        # forward then backward, indexed by a node's backward flag
+        return self.tree, self.backward_tree
+
+    def tree_of(self, half: SearchHalf) -> SearchTree:
+        return self.backward_tree if half.backward else self.tree
+
+    def cell_changed(self, cell_id: int) -> None:
+        pass
+
+    def move_goal(self, start, goal) -> None:
+        self.reset_open(start, goal)
+
+    def add_node(self, half: SearchHalf, key: int, node: BidirectionalNode,
+                 parent_id: int) -> None:
+        half.open.put(key, node)
+        half.reached[key] = node
+        self.tree_of(half).open(key, parent_id, node.global_cost)
+        self.pushes += 1
+        self.check_meeting(half, key, node)
+
+    def check_meeting(self, half: SearchHalf, key: int, node: BidirectionalNode) -> None:
+        other = self.backward if half is self.forward else self.forward
+        other_node = other.reached.get(key)
+        if other_node is not None and node.global_cost + other_node.global_cost < self.best_cost:
+            self.best_cost = node.global_cost + other_node.global_cost
+            self.meeting_id = key
+
+    def expand(self, half: SearchHalf, current: BidirectionalNode) -> None:
+        grid = self.grid
+        observer = self.observer
+        current_id = grid.pos_to_id(current.pos)
+        for key in grid.get_neighbour_ids(current_id):
+            if key in half.closed_ids:
+                continue
+            old_node = half.open.find(key)
+            if old_node is not None:
+                global_cost = current.global_cost + grid.estimate_remaining_cost(old_node.pos, current.pos)
+                if old_node.global_cost > global_cost:
+                    old_node.update_costs(current, global_cost)
+                    half.open.decrease_key(key, old_node)
+                    self.tree_of(half).open(key, current_id, global_cost)
+                    self.check_meeting(half, key, old_node)
+                    if observer is not None:
+                        observer.on_decrease_key(old_node)
+            else:
+                adjacent = grid.id_to_pos(key)
+                global_cost = current.global_cost + grid.estimate_remaining_cost(adjacent, current.pos)
+                estimated_remaining_cost = grid.estimate_remaining_cost(half.target, adjacent)
+                node = BidirectionalNode(adjacent, current, global_cost, estimated_remaining_cost,
+                                         self.priority_index, 10, half.backward)
+                self.priority_index += 1
+                self.add_node(half, key, node, current_id)
+                if observer is not None:
+                    observer.on_push(node)
+
+    def is_done(self) -> bool:
+        # no cheaper joined path can still be found once either bound is
+        # reached. Every path through an open node costs at least its f
+        # (its g for bfs, which does not order on f), and for bfs the two
+        # open lists are also at least a step apart
+        forward, backward = self.forward.open.qsize(), self.backward.open.qsize()
+        if forward == 0 and backward == 0:
+            return True
+        if self.best_cost == INFINITY:
+            return forward == 0 or backward == 0 or not self.grid.connected(self.start, self.goal)
+        tops = [half.peek() for half in (self.forward, self.backward) if half.open.qsize() > 0]
+        if BIDIRECTIONAL[self.selected] == "bfs":
+            if max(node.global_cost for node in tops) >= self.best_cost:
+                return True
+            return (len(tops) == 2 and
+                    tops[0].global_cost + tops[1].global_cost + MIN_STEP_COST >= self.best_cost)
+        return max(node.total_cost for node in tops) >= self.best_cost
+
+    def step(self) -> bool:
+        # expands one node, returns False once there is nothing left to do
+        if self.finished:
+            return False
+        if self.is_done():
+            return self.finish()
+
+        half = self.forward
+        if (self.forward.open.qsize() == 0
+                or 0 < self.backward.open.qsize() < self.forward.open.qsize()):
+            half = self.backward
+        current = self.current = half.open.get()
+        self.expansions += 1
+        self.expand(half, current)
+        current_id = self.grid.pos_to_id(current.pos)
+        half.closed_ids.add(current_id)
+        self.tree_of(half).close(current_id)
+        self.closed.append(current)
+        if self.observer is not None:
+            self.observer.on_expand(current)
+        if self.is_done():
+            return self.finish()
+        return True
+
+    def finish(self) -> bool:
+        self.finished = True
+        if self.meeting_id is None or not self.grid.connected(self.start, self.goal):
+            self.current = None
+            if self.observer is not None:
+                self.observer.on_exhausted()
+            return False
+
+        # join the two trees into one chain of nodes running start to goal
+        self.has_goal = True
+        positions = []
+        node = self.forward.reached[self.meeting_id]
+        while node is not None:
+            positions.append(node.pos)
+            node = node.parent
+        positions.reverse()
+        node = self.backward.reached[self.meeting_id].parent
+        while node is not None:
+            positions.append(node.pos)
+            node = node.parent
+
+        node = Node(positions[0], None, 0)
+        for pos in positions[1:]:
+            node = Node(pos, node, node.global_cost + self.grid.estimate_remaining_cost(pos, node.pos))
+            self.path.append(node)
+        self.current = node
+        if self.observer is not None:
+            self.observer.on_goal(node)
+        return True
+
+    def run(self) -> SearchResult:
+        while self.step():
+            pass
+        return self.result()
+
+    def result(self) -> SearchResult:
+        if not self.has_goal:
+            return SearchResult([], False, self.expansions, self.pushes, 0)
+        path = [self.start] + [node.pos for node in self.path]
+        return SearchResult(path, True, self.expansions, self.pushes,
+                            self.current.global_cost)
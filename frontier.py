@@ -0,0 +1,250 @@
+from __future__ import annotations
+from collections import deque
+from itertools import islice
+from heapq import heappush, heappop
+from typing import Callable, Hashable
+
+
+class HeapFrontier:
+    # single threaded replacement for queue.PriorityQueue
+    # entries are (sort_key, key, node) tuples so heapq only compares plain
+    # tuples. decrease-key pushes a new entry and leaves the old one in the
+    # heap, an entry is stale once its sort key is not the node's current one
+    def __init__(self, sort_key: Callable[[object], tuple]) -> None:
+        self.sort_key = sort_key
+        self.heap: list[tuple] = []
+        self.nodes: dict[Hashable, object] = {}
+
+    def put(self, key: Hashable, node) -> None:
+        node.sort_key = self.sort_key(node)
+        self.nodes[key] = node
+        heappush(self.heap, (node.sort_key, key, node))
+
+    def get(self):
+        heap = self.heap
+        sort_key, key, node = heappop(heap)
+        while node.sort_key is not sort_key:
+            sort_key, key, node = heappop(heap)
+        del self.nodes[key]
+        self.prune()
+        return node
+
+    def decrease_key(self, key: Hashable, node) -> None:
+        # call after the node's costs have been changed in place
+        sort_key = self.sort_key(node)
+        if sort_key != node.sort_key:
+            node.sort_key = sort_key
+            heappush(self.heap, (sort_key, key, node))
+            self.prune()
+
+    def find(self, key: Hashable):
+        return self.nodes.get(key)
+
+    def remove(self, key: Hashable) -> None:
+        # the heap entry goes stale and is dropped when it reaches the top
+        self.nodes.pop(key).sort_key = None
+        self.prune()
+
+    def prune(self) -> None:
+        # keep the top of the heap live so queue[0] is always the next node
+        heap = self.heap
+        while heap and heap[0][2].sort_key is not heap[0][0]:
+            heappop(heap)
+
+    def qsize(self) -> int:
+        return len(self.nodes)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.nodes
+
+    @property
+    def queue(self) -> list:
+        # live nodes in heap order, matching PriorityQueue.queue
+        return [node for sort_key, key, node in self.heap
+                if node.sort_key is sort_key]
+
+    def ordered(self):
+        # live nodes in priority order without sorting the whole heap. The
+        # heap is walked as a tree, only the children of nodes already
+        # yielded are candidates so each node costs O(log n)
+        heap = self.heap
+        candidates = [(heap[0][0], 0)] if heap else []
+        while candidates:
+            sort_key, i = heappop(candidates)
+            node = heap[i][2]
+            if node.sort_key is sort_key:
+                yield node
+            for child in (2*i + 1, 2*i + 2):
+                if child < len(heap):
+                    heappush(candidates, (heap[child][0], child))
+
+    def top(self, count: int, start: int=0) -> list:
+        # nodes start to start+count in the order get() would return them
+        return list(islice(self.ordered(), start, start + count))
+
+
+class BucketFrontier:
+    # Dial style bucket queue for integer costs. bucket_index maps a sort key
+    # to a bucket number so that lower buckets always hold smaller keys, and
+    # inside a bucket entries are kept in order with the next one at the end,
+    # so pushing and popping is a list append/pop. Only the bucket numbers
+    # go in a heap, once per bucket rather than once per node. Stale entries
+    # are skipped the same way HeapFrontier skips them
+    def __init__(self, sort_key: Callable[[object], tuple],
+                 bucket_index: Callable[[tuple], int]) -> None:
+        self.sort_key = sort_key
+        self.bucket_index = bucket_index
+        self.buckets: dict[int, list] = {}
+        # numbers of the non empty buckets, far fewer than there are entries
+        self.numbers: list[int] = []
+        self.nodes: dict[Hashable, object] = {}
+
+    def push(self, key: Hashable, node) -> None:
+        sort_key = node.sort_key
+        index = self.bucket_index(sort_key)
+        bucket_number = int(index)
+        if bucket_number != index or bucket_number < 0:
+            raise ValueError(f"bucket frontier needs whole, positive costs, got {sort_key}")
+        bucket = self.buckets.get(bucket_number)
+        if bucket is None:
+            self.buckets[bucket_number] = [(sort_key, key, node)]
+            heappush(self.numbers, bucket_number)
+        elif bucket[-1][0] < sort_key:
+            # only happens to nodes moved here by decrease-key. The bucket
+            # is in falling key order, keys that tie stay nearer the end
+            low, high = 0, len(bucket)
+            while low < high:
+                middle = (low + high) // 2
+                if bucket[middle][0] < sort_key:
+                    high = middle
+                else:
+                    low = middle + 1
+            bucket.insert(low, (sort_key, key, node))
+        else:
+            bucket.append((sort_key, key, node))
+
+    def put(self, key: Hashable, node) -> None:
+        node.sort_key = self.sort_key(node)
+        self.nodes[key] = node
+        self.push(key, node)
+
+    def get(self):
+        buckets = self.buckets
+        numbers = self.numbers
+        while True:
+            bucket = buckets[numbers[0]]
+            sort_key, key, node = bucket.pop()
+            if not bucket:
+                del buckets[heappop(numbers)]
+            if node.sort_key is sort_key:
+                break
+        del self.nodes[key]
+        return node
+
+    def decrease_key(self, key: Hashable, node) -> None:
+        sort_key = self.sort_key(node)
+        if sort_key != node.sort_key:
+            node.sort_key = sort_key
+            self.push(key, node)
+
+    def find(self, key: Hashable):
+        return self.nodes.get(key)
+
+    def qsize(self) -> int:
+        return len(self.nodes)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.nodes
+
+    @property
+    def queue(self) -> list:
+        # live nodes, next node first
+        nodes = []
+        for bucket_number in sorted(self.numbers):
+            nodes.extend(node for sort_key, key, node in reversed(self.buckets[bucket_number])
+                         if node.sort_key is sort_key)
+        return nodes
+
+    def ordered(self):
+        # same tree walk as HeapFrontier.ordered over the bucket numbers
+        numbers = self.numbers
+        candidates = [(numbers[0], 0)] if numbers else []
+        while candidates:
+            bucket_number, i = heappop(candidates)
+            for sort_key, key, node in reversed(self.buckets[bucket_number]):
+                if node.sort_key is sort_key:
+                    yield node
+            for child in (2*i + 1, 2*i + 2):
+                if child < len(numbers):
+                    heappush(candidates, (numbers[child], child))
+
+    def top(self, count: int, start: int=0) -> list:
+        return list(islice(self.ordered(), start, start + count))
+
+
+class FifoFrontier:
+    # breadth first, nodes come out in the order they went in. Decrease-key
+    # never moves a node since bfs only orders on insertion order
+    def __init__(self) -> None:
+        self.items: deque = deque()
+        self.nodes: dict[Hashable, object] = {}
+
+    def put(self, key: Hashable, node) -> None:
+        self.nodes[key] = node
+        self.items.append((key, node))
+
+    def get(self):
+        key, node = self.items.popleft()
+        del self.nodes[key]
+        return node
+
+    def decrease_key(self, key: Hashable, node) -> None:
+        pass
+
+    def find(self, key: Hashable):
+        return self.nodes.get(key)
+
+    def qsize(self) -> int:
+        return len(self.nodes)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.nodes
+
+    @property
+    def queue(self) -> list:
+        # next node first
+        return [node for key, node in self.items]
+
+    def ordered(self):
+        return (node for key, node in self.items)
+
+    def top(self, count: int, start: int=0) -> list:
+        return list(islice(self.ordered(), start, start + count))
+
+
+class LifoFrontier(FifoFrontier):
+    # depth first, the newest node comes out first
+    def __init__(self) -> None:
+        super().__init__()
+        self.items: list = []
+
+    def get(self):
+        key, node = self.items.pop()
+        del self.nodes[key]
+        return node
+
+    @property
+    def queue(self) -> list:
+        return [node for key, node in reversed(self.items)]
+
+    def ordered(self):
+        return (node for key, node in reversed(self.items))
@@ -1,38 +1,73 @@
 import pygame as pg
+from time import perf_counter
 from player import Player
 from agents import AStar, Goal
-from queue import PriorityQueue
-from agents import Node
+
+# how far the search advances each frame: steps_per_frame expansions, as
+# many expansions as fit in frame_budget milliseconds, or the whole search
+# in one frame before the player is animated along the path
+STEPPING_MODES = ("steps", "budget", "complete")
+
+CHOICES = ["bfs", "dfs", "bestFirst", "astar", "iterative", "lpastar",
+           "biBfs", "biAstar"]
+# jump point search only works on square grids
+SQUARE_CHOICES = CHOICES + ["jps"]
+
+# scattered walls (wall_num of them), or one of the generators in mapgen
+MAP_STYLES = ("walls", "caves", "division", "prim")
+
+# where w records traces to when no trace_dir was given
+TRACE_DIR = "traces"
 
 
 class GameController:
     def __init__(self, screen, grid, goal_pos, agent_type="bfs",
                  key_interval: int=200, wall_num=0, is_regenerate=True,
-                 is_random_start=True, change_agent_type=True, wait_time=1000) -> None:
+                 is_random_start=True, change_agent_type=True, wait_time=1000,
+                 frontier="heap", stepping="steps", steps_per_frame=1,
+                 frame_budget=10, choices=CHOICES, map_style="walls",
+                 trace_dir=None) -> None:
+        if stepping not in STEPPING_MODES:
+            raise ValueError(f"unknown stepping {stepping!r}, expected one of {STEPPING_MODES}")
+        if map_style not in MAP_STYLES:
+            raise ValueError(f"unknown map style {map_style!r}, expected one of {MAP_STYLES}")
         self.interval = key_interval
         self.lastTime = {pg.K_s:0, pg.K_a:0, pg.K_d:0, pg.K_e:0,
                          pg.K_b:0, pg.K_r:0, pg.K_t:0, pg.K_f:0, pg.K_g: 0,
-                         pg.K_v: 0, pg.MOUSEBUTTONDOWN: 0, pg.K_c:0, pg.K_x:0}
+                         pg.K_v: 0, pg.MOUSEBUTTONDOWN: 0, pg.K_c:0, pg.K_x:0,
+                         pg.K_n:0, pg.K_m:0, pg.K_w:0}
         self.grid = grid
-        grid.generate_walls(wall_num, goal_pos)
+        if map_style == "walls":
+            grid.generate_walls(wall_num, goal_pos)
+        else:
+            grid.generate_map(map_style, (goal_pos,))
 
         # create game objects
         self.goal = Goal(screen, goal_pos, pg.Color("blue"))
         self.player = Player(screen, grid.coords_to_pos(grid.start_pos), grid.start_pos, pg.Color("red"))
-        self.agent = AStar(self.player, self.goal, grid, agent_type)
+        self.trace_dir = trace_dir or TRACE_DIR
+        self.agent = AStar(self.player, self.goal, grid, agent_type, frontier)
+        # the agent set up its first search unrecorded, so it starts again
+        self.agent.trace_dir = trace_dir
+        if trace_dir is not None:
+            self.agent.reset()
 
         # self.agent = agent
         self.is_started = False
         self.wall_num=wall_num
         self.is_regenerate = is_regenerate
         self.is_random_start = is_random_start
-        self.choices = ["bfs", "dfs", "bestFirst", "astar", "iterative"]
+        self.choices = list(choices)
         self.choice = self.choices.index(agent_type)
         self.wait_timer = 0
         self.wait_time = wait_time
         self.change_agent_type = change_agent_type
         self.has_reset = False
         self.step_by_step = False
+        self.stepping = stepping
+        self.steps_per_frame = steps_per_frame
+        self.frame_budget = frame_budget
+        self.map_style = map_style
 
     def reset(self) -> None:
         self.grid.reset()
@@ -45,8 +80,14 @@ class GameController:
     def regenerate_map(self, wall_num=None):
         wall_num = self.wall_num if wall_num == None else wall_num
         self.grid.generate_cells()
+        # random positions are picked once the map is made, so the start
+        # can always reach the goal. Fixed ones are kept open
+        start_pos = self.grid.coords_to_pos(self.player.trail[0])
+        if self.map_style == "walls":
+            self.grid.generate_walls(wall_num, self.agent.goal.pos, start_pos)
+        else:
+            self.grid.generate_map(self.map_style, (self.agent.goal.pos, start_pos))
         self.reset()
-        self.grid.generate_walls(wall_num, self.agent.goal.pos, self.player.pos)
 
     def update(self, screen, dt):
 
@@ -56,7 +97,7 @@ class GameController:
         self.check_keys()
 
         # Only run simulation if it is_started
-        if self.is_started and self.agent.update():
+        if self.is_started and self.update_agent():
             if self.step_by_step:
                 self.is_started = False
 
@@ -77,6 +118,16 @@ class GameController:
                 else:
                     self.reset()
 
+    def update_agent(self):
+        # step by step always advances a single expansion per press of s
+        if self.step_by_step:
+            return self.agent.update()
+        if self.stepping == "budget":
+            return self.agent.update(None, perf_counter() + self.frame_budget/1000)
+        if self.stepping == "complete":
+            return self.agent.update(None)
+        return self.agent.update(self.steps_per_frame)
+
     def check_keys(self):
         keys = pg.key.get_pressed()
         if keys[pg.K_c] and pg.time.get_ticks() > self.interval + self.lastTime[pg.K_c]:
@@ -96,6 +147,10 @@ class GameController:
             self.lastTime[pg.K_x] = pg.time.get_ticks()
             self.step_by_step = not self.step_by_step
 
+        if keys[pg.K_n] and pg.time.get_ticks() > self.interval + self.lastTime[pg.K_n]:
+            self.lastTime[pg.K_n] = pg.time.get_ticks()
+            self.stepping = STEPPING_MODES[(STEPPING_MODES.index(self.stepping) + 1) % len(STEPPING_MODES)]
+
         if keys[pg.K_s] and pg.time.get_ticks() > self.interval + self.lastTime[pg.K_s]:
             self.lastTime[pg.K_s] = pg.time.get_ticks()
             self.is_started = not self.is_started
@@ -131,6 +186,18 @@ class GameController:
             self.reset()
             self.is_random_start = temp
 
+        if keys[pg.K_m] and pg.time.get_ticks() > self.interval + self.lastTime[pg.K_m]:
+            self.lastTime[pg.K_m] = pg.time.get_ticks()
+            self.map_style = MAP_STYLES[(MAP_STYLES.index(self.map_style) + 1) % len(MAP_STYLES)]
+            temp, self.is_random_start = self.is_random_start, True
+            self.regenerate_map()
+            self.is_random_start = temp
+
+        if keys[pg.K_w] and pg.time.get_ticks() > self.interval + self.lastTime[pg.K_w]:
+            self.lastTime[pg.K_w] = pg.time.get_ticks()
+            # takes effect from the next search
+            self.agent.trace_dir = None if self.agent.trace_dir else self.trace_dir
+
         if keys[pg.K_v] and pg.time.get_ticks() > self.interval + self.lastTime[pg.K_v]:
             self.lastTime[pg.K_v] = pg.time.get_ticks()
             temp, self.is_random_start = self.is_random_start, True
@@ -146,12 +213,13 @@ class GameController:
                     self.grid.clear_cell(mouse_pos)
                 else:
                     self.grid.new_cell(mouse_pos)
+                self.agent.cell_changed(mouse_pos)
             elif pg.mouse.get_pressed()[1]:
                 self.player.pos = mouse_pos
                 self.agent.reset_open()
             elif pg.mouse.get_pressed()[2]:
                 self.goal.pos = mouse_pos
-                self.agent.reset_open()
+                self.agent.move_goal()
 
     def sync_with(self, other):
         if self.wait_timer != other.wait_timer:
@@ -165,11 +233,11 @@ class GameController:
             c.goal.pos = c2.goal.pos.copy()
             # c.reset()
             c.player.pos = c2.player.pos.copy()
-            c.agent.open = PriorityQueue()
-            c.grid.cells = c2.grid.copy()
+            # the map is shared first and the search set up on it after, so
+            # a search restored from the cache keeps its colours
+            c.grid.share_map(c2.grid)
+            c.grid.reset()
             c.has_reset = False
             c2.has_reset = False
-            estimated_cost = c.grid.estimate_remaining_cost(
-                c.goal.pos, c.player.pos)
-            c.agent.open.put(Node(c.player.pos, None, 0, estimated_cost, 0, 5, c.agent.selected))
+            c.agent.reset()
             c.player.reset_trail(c.grid.pos_to_coords(c.player.pos))
\ No newline at end of file
@@ -1,11 +1,210 @@
 from math import pi
-from pygame import Color, draw, Vector2, display, gfxdraw, Vector3, font
-from random import randint
+from pygame import Color, draw, Vector2, display, gfxdraw, Vector3, font, Rect, Surface
+from random import choice, randint, sample, getrandbits
 from abc import ABC, abstractmethod
 from math import cos
+from array import array
+from itertools import count
+
+# every map change takes the next number, so a version is never shared by
+# two different maps, even across grids
+MAP_VERSIONS = count(1)
+# flat geometric neighbour tables by grid class and shape. A table depends
+# on nothing else, so every map of one shape shares it
+GEOMETRIC_TABLES: dict = {}
+MAX_GEOMETRIC_TABLES = 8
+
+
+class Adjacency:
+    # neighbour ids for every cell in compressed sparse row form. Rows are
+    # padded to the most neighbours a cell can have, so row i starts at
+    # i * stride and a row can be patched in place when a wall toggles.
+    # ids and count are filled from passable unless they are passed in
+    def __init__(self, geometric: array, passable: list[bool], stride: int,
+                 ids: array=None, count: array=None) -> None:
+        self.stride = stride
+        self.passable = passable
+        # every in bounds neighbour, walls included, in get_neighbours
+        # order. Shared with other maps of the same shape, never written
+        self.geometric = geometric
+        if ids is not None:
+            self.ids = ids
+            self.count = count
+            return
+        self.ids = array('i', [-1]) * len(geometric)
+        self.count = array('i', [0]) * (len(geometric) // stride)
+        for cell_id in range(len(self.count)):
+            self.fill_row(cell_id)
+
+    def fill_row(self, cell_id: int) -> None:
+        offset = cell_id * self.stride
+        count = 0
+        for neighbour in self.geometric[offset:offset + self.stride]:
+            if neighbour >= 0 and self.passable[neighbour]:
+                self.ids[offset + count] = neighbour
+                count += 1
+        self.count[cell_id] = count
+
+    def neighbours(self, cell_id: int) -> array:
+        offset = cell_id * self.stride
+        return self.ids[offset:offset + self.count[cell_id]]
+
+    def copy(self, passable: list[bool]) -> "Adjacency":
+        # the geometric table never changes so it is shared
+        adjacency = Adjacency.__new__(Adjacency)
+        adjacency.stride = self.stride
+        adjacency.passable = passable
+        adjacency.geometric = self.geometric
+        adjacency.ids = self.ids[:]
+        adjacency.count = self.count[:]
+        return adjacency
+
+    def set_passable(self, cell_id: int, passable: bool) -> None:
+        # only the rows of cells next to cell_id can change
+        self.passable[cell_id] = passable
+        offset = cell_id * self.stride
+        for neighbour in self.geometric[offset:offset + self.stride]:
+            if neighbour >= 0:
+                self.fill_row(neighbour)
+
+
+class Components:
+    # connected component label of every cell, -1 for walls. Labelled once
+    # from an Adjacency, then kept up to date one cell at a time, so two
+    # cells can be checked for a path between them with a lookup
+    def __init__(self, adjacency: Adjacency) -> None:
+        self.labels = array('i', [-1]) * len(adjacency.count)
+        self.sizes: dict[int, int] = {}
+        self.next_label = 0
+        for cell_id, passable in enumerate(adjacency.passable):
+            if passable and self.labels[cell_id] < 0:
+                self.sizes[self.next_label] = self.flood(cell_id, self.next_label, adjacency)
+                self.next_label += 1
+
+    def flood(self, cell_id: int, label: int, adjacency: Adjacency) -> int:
+        # gives label to every cell reachable from cell_id, returns how many
+        labels = self.labels
+        labels[cell_id] = label
+        stack = [cell_id]
+        size = 0
+        while stack:
+            current = stack.pop()
+            size += 1
+            for neighbour in adjacency.neighbours(current):
+                if labels[neighbour] != label:
+                    labels[neighbour] = label
+                    stack.append(neighbour)
+        return size
+
+    def copy(self) -> "Components":
+        components = Components.__new__(Components)
+        components.labels = self.labels[:]
+        components.sizes = dict(self.sizes)
+        components.next_label = self.next_label
+        return components
+
+    def connected(self, start_id: int, goal_id: int, adjacency: Adjacency) -> bool:
+        if start_id == goal_id:
+            return True
+        labels = self.labels
+        goal = labels[goal_id]
+        if goal < 0:
+            return False
+        if labels[start_id] >= 0:
+            return labels[start_id] == goal
+        # a start inside a wall can still step out to its neighbours
+        return any(labels[neighbour] == goal for neighbour in adjacency.neighbours(start_id))
+
+    def set_passable(self, cell_id: int, passable: bool, adjacency: Adjacency) -> None:
+        # call after adjacency has been patched for the change
+        if passable == (self.labels[cell_id] >= 0):
+            return
+        if passable:
+            self.open_cell(cell_id, adjacency)
+        else:
+            self.close_cell(cell_id, adjacency)
+
+    def open_cell(self, cell_id: int, adjacency: Adjacency) -> None:
+        # joins every component next to the cell, the smaller ones are
+        # relabelled into the biggest
+        labels, sizes = self.labels, self.sizes
+        touching = {labels[neighbour]: neighbour for neighbour in adjacency.neighbours(cell_id)}
+        if not touching:
+            labels[cell_id] = self.next_label
+            sizes[self.next_label] = 1
+            self.next_label += 1
+            return
+        biggest = max(touching, key=sizes.get)
+        labels[cell_id] = biggest
+        sizes[biggest] += 1
+        for label, neighbour in touching.items():
+            if label != biggest:
+                sizes[biggest] += self.flood(neighbour, biggest, adjacency)
+                del sizes[label]
+
+    def close_cell(self, cell_id: int, adjacency: Adjacency) -> None:
+        # the cell's component may have been cut in two or more. A flood
+        # runs from each open neighbour in turn, one cell at a time, and
+        # floods that meet are merged, so the work stops once all but one
+        # piece is fully explored and is bounded by the smaller pieces
+        labels, sizes = self.labels, self.sizes
+        label = labels[cell_id]
+        labels[cell_id] = -1
+        sizes[label] -= 1
+        starts = list(adjacency.neighbours(cell_id))
+        if len(starts) < 2:
+            if sizes[label] == 0:
+                del sizes[label]
+            return
+
+        owner = {start: i for i, start in enumerate(starts)}
+        merged = list(range(len(starts)))
+        def find(flood):
+            while merged[flood] != flood:
+                merged[flood] = merged[merged[flood]]
+                flood = merged[flood]
+            return flood
+        stacks = [[start] for start in starts]
+        while True:
+            groups = {find(flood) for flood in range(len(starts))}
+            if len(groups) == 1:
+                # still one piece
+                return
+            growing = {find(flood) for flood in range(len(starts)) if stacks[flood]}
+            if len(growing) <= 1:
+                break
+            for flood, stack in enumerate(stacks):
+                if not stack:
+                    continue
+                current = stack.pop()
+                for neighbour in adjacency.neighbours(current):
+                    other = owner.get(neighbour)
+                    if other is None:
+                        owner[neighbour] = flood
+                        stack.append(neighbour)
+                    elif find(other) != find(flood):
+                        merged[find(other)] = find(flood)
+
+        # every finished group is a whole piece and gets a new label, the
+        # one still growing (or else the biggest) keeps the old label
+        members: dict[int, list[int]] = {}
+        for cell, flood in owner.items():
+            members.setdefault(find(flood), []).append(cell)
+        keep = growing.pop() if growing else max(members, key=lambda group: len(members[group]))
+        for group, cells in members.items():
+            if group == keep:
+                continue
+            for cell in cells:
+                labels[cell] = self.next_label
+            sizes[self.next_label] = len(cells)
+            sizes[label] -= len(cells)
+            self.next_label += 1
 
 
 class Grid(ABC):
+    # transparent colour of the cached layer, shows through where walls are
+    LAYER_KEY = Color(1, 2, 3)
+
     def __init__(self, cell_num: Vector2, center: Vector2, cell,
                  colour: Color=Color(0,168,32), size: float=20, overlay=False) -> None:
         self.overlay=overlay
@@ -14,9 +213,42 @@ class Grid(ABC):
         self.colour = colour
         self.center = center
         self.cell = cell
+        self.adjacency: Adjacency = None
+        # built with the adjacency and dropped with it
+        self.components: Components = None
+        # last connected() answer and the map version, start and goal it
+        # was for. Positions are never changed in place, so they are
+        # compared by identity
+        self.connected_key = (None, None, None)
+        self.is_connected = True
+        # cells are painted once onto self.layer, after that only cells in
+        # self.dirty are repainted. layer is None when it needs a full repaint
+        self.layer: Surface = None
+        self.dirty: set[int] = set()
+        # screen positions of every cell, rebuilt by check_geometry whenever
+        # get_geometry_key changes
+        self.geometry_key = None
+        self.centres: list[Vector2] = []
+        # the agent's search.SearchTrees, drawn by the overlay
+        self.search_trees = ()
         self.start_pos = self.get_start_pos()
         self.generate_cells()
 
+    # anything that swaps the cells out, including the side by side apps
+    # copying a map across, drops the adjacency and the cached layer so they
+    # are rebuilt on demand
+    @property
+    def cells(self):
+        return self._cells
+
+    @cells.setter
+    def cells(self, cells):
+        self._cells = cells
+        self.version = next(MAP_VERSIONS)
+        self.adjacency = None
+        self.components = None
+        self.layer = None
+
     def get_start_pos(self):
         return self.center - self.size.elementwise() * self.cell_num/2
 
@@ -29,34 +261,175 @@ class Grid(ABC):
             self.cells.append(col)
 
     def generate_walls(self, number_of_walls, goal_pos, player_pos=Vector3(0,0,0)):
-        for i in range(number_of_walls):
-            random_pos = self.random_pos()
-            while (not self.is_valid_pos(random_pos)) or random_pos == goal_pos or random_pos == player_pos:
-                random_pos = self.random_pos()
-            self.clear_cell(random_pos)
+        # sampled without replacement, so a dense map costs no more per wall
+        # than a sparse one
+        keep = {self.pos_to_id(pos) for pos in (goal_pos, player_pos) if self.is_valid_pos(pos)}
+        candidates = [cell_id for cell_id, passable in enumerate(self.get_passable())
+                      if passable and cell_id not in keep]
+        self.set_walls(sample(candidates, min(number_of_walls, len(candidates))))
+
+    def set_walls(self, cell_ids) -> None:
+        rows = int(self.cell_num.y)
+        for cell_id in cell_ids:
+            column, row = divmod(int(cell_id), rows)
+            self.cells[column][row] = None
+        self.map_replaced()
+
+    def load_map(self, passable) -> None:
+        # passable is indexed by cell id
+        rows = int(self.cell_num.y)
+        for cell_id, is_open in enumerate(passable):
+            column, row = divmod(cell_id, rows)
+            if not is_open:
+                self.cells[column][row] = None
+            elif self.cells[column][row] is None:
+                self.cells[column][row] = self.cell.make_cell(column, row, self.size, self.colour)
+        self.map_replaced()
+
+    def map_replaced(self) -> None:
+        # cheaper to rebuild once than to patch for every cell
+        self.version = next(MAP_VERSIONS)
+        self.adjacency = None
+        self.components = None
+        self.layer = None
+
+    def generate_map(self, style: str, keep=(), seed: int=None) -> None:
+        # caves or a maze from mapgen, the positions in keep stay open.
+        # Without a seed one is drawn from random, so random.seed still
+        # fixes the map
+        from mapgen import generate
+        if seed is None:
+            seed = getrandbits(32)
+        passable = generate(style, int(self.cell_num.x), int(self.cell_num.y), seed)
+        for pos in keep:
+            if self.is_valid_pos(pos):
+                passable[self.pos_to_id(pos)] = True
+        self.load_map(passable)
 
     def reset(self):
         for col in self.cells:
             for cell in col:
                 if cell is not None:
                     cell.colour = self.colour
-                    cell.parent_pos = None
+        self.layer = None
 
     def get_size(self):
         return self.cell_num.y * self.cell_num.x
 
-    @abstractmethod
     def get_neighbours(self, pos):
+        return [self.id_to_pos(cell_id)
+                for cell_id in self.get_neighbour_ids(self.pos_to_id(pos))]
+
+    def get_neighbour_ids(self, cell_id: int) -> array:
+        return self.get_adjacency().neighbours(cell_id)
+
+    def get_adjacency(self) -> Adjacency:
+        if self.adjacency is None:
+            self.adjacency = self.build_adjacency()
+        return self.adjacency
+
+    def get_components(self) -> Components:
+        if self.components is None:
+            self.components = Components(self.get_adjacency())
+        return self.components
+
+    def connected(self, start, goal) -> bool:
+        # True when a search from start can reach goal. Engines ask every
+        # step, so the answer is kept until the map or either end changes
+        version, last_start, last_goal = self.connected_key
+        if version != self.version or last_start is not start or last_goal is not goal:
+            self.connected_key = (self.version, start, goal)
+            self.is_connected = self.get_components().connected(
+                self.pos_to_id(start), self.pos_to_id(goal), self.get_adjacency())
+        return self.is_connected
+
+    def random_connected_pos(self, pos):
+        # a random open cell with a path to pos
+        cell_id = self.pos_to_id(pos)
+        components = self.get_components()
+        label = components.labels[cell_id]
+        if label < 0:
+            return self.random_pos()
+        return self.id_to_pos(choice([other for other, other_label in enumerate(components.labels)
+                                      if other_label == label]))
+
+    def build_adjacency(self) -> Adjacency:
+        return Adjacency(self.get_geometric(), self.get_passable(), self.MAX_NEIGHBOURS)
+
+    def get_geometric(self) -> array:
+        key = (type(self), int(self.cell_num.x), int(self.cell_num.y))
+        geometric = GEOMETRIC_TABLES.get(key)
+        if geometric is None:
+            if len(GEOMETRIC_TABLES) >= MAX_GEOMETRIC_TABLES:
+                del GEOMETRIC_TABLES[next(iter(GEOMETRIC_TABLES))]
+            geometric = GEOMETRIC_TABLES[key] = self.build_geometric()
+        return geometric
+
+    def build_geometric(self) -> array:
+        # neighbour rows padded to MAX_NEIGHBOURS with -1
+        rows = int(self.cell_num.y)
+        stride = self.MAX_NEIGHBOURS
+        geometric = array('i', [-1]) * (int(self.get_size()) * stride)
+        for column in range(int(self.cell_num.x)):
+            for row in range(rows):
+                neighbours = self.geometric_neighbours(column, row)
+                offset = (column * rows + row) * stride
+                geometric[offset:offset + len(neighbours)] = array('i', neighbours)
+        return geometric
+
+    def get_passable(self) -> list[bool]:
+        # indexed by cell id
+        return [cell is not None for col in self.cells for cell in col]
+
+    def geometric_neighbours(self, column: int, row: int) -> list[int]:
+        # ids of the in bounds neighbours of a cell, walls included
+        columns, rows = int(self.cell_num.x), int(self.cell_num.y)
+        neighbours = []
+        for i, j in self.OFFSETS:
+            q = column + i
+            index_row = self.neighbour_row(column, row, i, j)
+            if 0 <= q < columns and 0 <= index_row < rows:
+                neighbours.append(q * rows + index_row)
+        return neighbours
+
+    @abstractmethod
+    def neighbour_row(self, column, row, i: int, j: int):
+        # storage row of the neighbour at offset i, j, works on numpy arrays
+        # of columns and rows as well as on ints
         pass
 
+    def set_passable(self, cell_id: int, passable: bool) -> None:
+        self.version = next(MAP_VERSIONS)
+        if self.adjacency is not None:
+            self.adjacency.set_passable(cell_id, passable)
+            if self.components is not None:
+                self.components.set_passable(cell_id, passable, self.adjacency)
+        else:
+            self.components = None
+        # outlines overlap, so the neighbours are repainted along with it
+        self.dirty.add(cell_id)
+        self.dirty.update(self.geometric_neighbours(*divmod(cell_id, int(self.cell_num.y))))
+
     def set_highlight(self, pos: Vector3, colour = Color(168,0,168)):
         if self.is_valid_pos(pos) and self.get_cell(pos) is not None:
             self.get_cell(pos).colour = colour
+            self.dirty.add(self.pos_to_id(pos))
         else:
             print("not valid", pos)
 
-    def set_parent(self, pos, parent_pos):
-        self.get_cell(pos).parent_pos = parent_pos
+    def set_highlights(self, cell_ids, colour: Color) -> None:
+        # many cells in one call, walls are skipped
+        rows = int(self.cell_num.y)
+        for cell_id in cell_ids:
+            cell = self.cells[cell_id // rows][cell_id % rows]
+            if cell is not None:
+                cell.colour = colour
+                if self.layer is not None:
+                    self.dirty.add(cell_id)
+
+    def share_map(self, other: "Grid") -> None:
+        # object grids keep walls and colours together, so they copy
+        self.cells = other.copy()
 
     def copy(self):
         cells = []
@@ -97,26 +470,100 @@ class Grid(ABC):
     def get_cell(self, index_pos):
         return self.cells[int(index_pos.x)][int(index_pos.y)]
 
+    # cells are numbered column by column, id = column * rows + row
+    def pos_to_index(self, pos) -> tuple[int, int]:
+        return int(pos.x), int(pos.y)
+
+    def index_to_pos(self, column: int, row: int):
+        return Vector2(column, row)
+
+    def pos_to_id(self, pos) -> int:
+        column, row = self.pos_to_index(pos)
+        return column * int(self.cell_num.y) + row
+
+    def id_to_pos(self, cell_id: int):
+        return self.index_to_pos(*divmod(cell_id, int(self.cell_num.y)))
+
     def clear_cell(self, pos):
         self.cells[int(pos.x)][int(pos.y)] = None
+        self.set_passable(int(pos.x) * int(self.cell_num.y) + int(pos.y), False)
 
     def new_cell(self, pos):
         cell = self.cell(pos, self.size, self.colour)
         self.cells[int(pos.x)][int(pos.y)] = cell
+        self.set_passable(int(pos.x) * int(self.cell_num.y) + int(pos.y), True)
+
+    def get_cell_colour(self, cell_id: int) -> Color:
+        # None for walls
+        cell = self.cells[cell_id // int(self.cell_num.y)][cell_id % int(self.cell_num.y)]
+        return None if cell is None else cell.colour
+
+    def get_geometry_key(self) -> tuple:
+        return (tuple(self.center), tuple(self.size))
+
+    def check_geometry(self) -> None:
+        key = self.get_geometry_key()
+        if key != self.geometry_key:
+            self.geometry_key = key
+            self.build_geometry()
+
+    def build_geometry(self) -> None:
+        self.start_pos = self.get_start_pos()
+        self.centres = [self.pos_to_coords(self.id_to_pos(cell_id))
+                        for cell_id in range(int(self.get_size()))]
+        self.layer_rect = self.get_layer_rect()
+        self.layer = None
+
+    def get_layer_rect(self) -> Rect:
+        # screen area covered by the cells, with room for the outlines
+        margin = max(self.size.x, self.size.y) + 2
+        left = min(c.x for c in self.centres) - margin
+        top = min(c.y for c in self.centres) - margin
+        right = max(c.x for c in self.centres) + margin
+        bottom = max(c.y for c in self.centres) + margin
+        return Rect(left, top, right - left, bottom - top)
+
+    def paint_cell(self, cell_id: int) -> None:
+        coords = self.centres[cell_id] - Vector2(self.layer_rect.topleft)
+        colour = self.get_cell_colour(cell_id)
+        if colour is None:
+            self.cell.erase(self.layer, self.size, coords, self.LAYER_KEY)
+        else:
+            pos = self.id_to_pos(cell_id)
+            self.cell.draw(self.layer, self.cell(pos, self.size, colour), coords)
 
-    @abstractmethod
     def draw(self, screen) -> None:
-        pass
+        self.check_geometry()
+        if self.layer is None:
+            self.layer = Surface(self.layer_rect.size)
+            self.layer.fill(self.LAYER_KEY)
+            self.layer.set_colorkey(self.LAYER_KEY)
+            for cell_id in range(int(self.get_size())):
+                if self.get_cell_colour(cell_id) is not None:
+                    self.paint_cell(cell_id)
+        else:
+            for cell_id in self.dirty:
+                self.paint_cell(cell_id)
+        self.dirty.clear()
+        screen.blit(self.layer, self.layer_rect)
+        if self.overlay:
+            self.draw_overlay(screen)
+
+    def draw_overlay(self, screen) -> None:
+        # a line from every cell in the search trees to its parent
+        for tree in self.search_trees:
+            for cell_id, parent_id in enumerate(tree.parent):
+                if parent_id >= 0:
+                    draw.line(screen, (255, 255, 255), self.centres[cell_id], self.centres[parent_id])
 
     @abstractmethod
     def draw_trail(self, screen, pos):
         pass
 
 class Hex(Vector3):
-    def __init__(self, pos, size, colour: Color, parent_pos=None) -> None:
+    def __init__(self, pos, size, colour: Color) -> None:
         super().__init__(pos)
         self.colour = colour
-        self.parent_pos = parent_pos
         self.size = size
 
     def copy_cell(self):
@@ -133,8 +580,22 @@ class Hex(Vector3):
         p2 = []
         for p in Hex.get_points(Vector2(cell.size.x, 0)):
             p2.append(p + coords)
-        gfxdraw.filled_polygon(screen, p2, cell.colour)
-        draw.polygon(screen, Color("black").lerp(cell.colour, 0.8), p2, 1)
+        Hex.draw_polygon(screen, p2, cell.colour)
+
+    @staticmethod
+    def draw_polygon(screen, points, colour):
+        gfxdraw.filled_polygon(screen, points, colour)
+        draw.polygon(screen, Color("black").lerp(colour, 0.8), points, 1)
+
+    @staticmethod
+    def erase(screen, size, coords, colour):
+        p2 = [p + coords for p in Hex.get_points(Vector2(size.x, 0))]
+        Hex.erase_polygon(screen, p2, colour)
+
+    @staticmethod
+    def erase_polygon(screen, points, colour):
+        draw.polygon(screen, colour, points)
+        draw.polygon(screen, colour, points, 1)
 
     @staticmethod
     def get_points(unitVector) -> list[Vector2]:
@@ -144,6 +605,10 @@ class Hex(Vector3):
         return points
 
 class HexGrid(Grid):
+    MAX_NEIGHBOURS = 6
+    # same order as looping i, j, k over -1, 0, 1 in cube coordinates
+    OFFSETS = ((-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0))
+
     def __init__(self, cell_num: Vector2, center: Vector2,
                  colour: Color=Color(0,168,32), size: float=20, pointy=False, overlay=False) -> None:
         super().__init__(cell_num, center, Hex, colour, Vector2(size/2, (size/2)*cos(pi/6)), overlay)
@@ -154,16 +619,8 @@ class HexGrid(Grid):
     def get_start_pos(self):
         return self.center - Vector2(self.cell_num.x * self.size.x * 3/4, self.cell_num.y*self.size.y)
 
-    def get_neighbours(self, pos) -> list[Vector3]:
-        neighbours = []
-        for i in [-1, 0, 1]:
-            for j in [-1, 0, 1]:
-                for k in [-1, 0, 1]:
-                    if i != j or j != k:
-                        rel_pos = pos + Vector3(i, j, k)
-                        if self.is_valid_pos(rel_pos) and self.get_cell(rel_pos) is not None:
-                            neighbours.append(rel_pos)
-        return neighbours
+    def neighbour_row(self, column, row, i: int, j: int):
+        return row - column//2 + j + (column + i)//2
 
     def estimate_remaining_cost(self, pos_1: Vector2, pos_2: Vector2):
         d_pos = pos_1 - pos_2
@@ -214,30 +671,43 @@ class HexGrid(Grid):
         y -= x
         return Vector3(x, y, 0-x-y)
 
-    def draw(self, screen) -> None:
-        for cell_row in self.cells:
-            for cell in cell_row:
-                if cell is not None:
-                    coords = self.pos_to_coords(cell)
-                    self.cell.draw(screen, cell, coords)
-        if self.overlay:
-            for cell_row in self.cells:
-                for cell in cell_row:
-                    if cell is not None and cell.parent_pos is not None:
-                        start_pos = self.pos_to_coords(cell)
-                        end_pos = self.pos_to_coords(cell.parent_pos)
-                        draw.line(screen, (255, 255, 255), start_pos, end_pos)
-                # gfxdraw.aapolygon(screen, p2, Color("black"))
+    def get_geometry_key(self) -> tuple:
+        return super().get_geometry_key() + (self.pointy,)
+
+    def build_geometry(self) -> None:
+        # vertices of every cell, the cell polygons relative to the layer
+        # and the (possibly rotated) trail polygons on screen
+        super().build_geometry()
+        offset = Vector2(self.layer_rect.topleft)
+        cell_points = self.cell.get_points(Vector2(self.size.x, 0))
+        trail_points = self.cell.get_points(self.unitVector)
+        self.cell_points = [[tuple(centre + p - offset) for p in cell_points]
+                            for centre in self.centres]
+        self.trail_points = [[tuple(centre + p) for p in trail_points]
+                             for centre in self.centres]
+
+    def paint_cell(self, cell_id: int) -> None:
+        colour = self.get_cell_colour(cell_id)
+        points = self.cell_points[cell_id]
+        if colour is None:
+            self.cell.erase_polygon(self.layer, points, self.LAYER_KEY)
+        else:
+            self.cell.draw_polygon(self.layer, points, colour)
 
     def draw_trail(self, screen, pos):
-        p2 = []
-        for p in self.cell.get_points(self.unitVector):
-            p2.append(p + self.pos_to_coords(pos))
-        gfxdraw.filled_polygon(screen, p2, Color('orange'))
+        self.check_geometry()
+        gfxdraw.filled_polygon(screen, self.trail_points[self.pos_to_id(pos)], Color('orange'))
 
     def get_cell(self, pos):
         return super().get_cell(Vector2(pos.x, pos.y + pos.x//2))
 
+    def pos_to_index(self, pos) -> tuple[int, int]:
+        return int(pos.x), int(pos.y + pos.x//2)
+
+    def index_to_pos(self, column: int, row: int) -> Vector3:
+        r = row - column//2
+        return Vector3(column, r, 0 - r - column)
+
     def clear_cell(self, pos):
         return super().clear_cell(Vector2(pos.x, pos.y + pos.x//2))
 
@@ -245,6 +715,7 @@ class HexGrid(Grid):
         cell = self.cell(pos, self.size, self.colour)
         index = Vector2(pos.x, pos.y + pos.x//2)
         self.cells[int(index.x)][int(index.y)] = cell
+        self.set_passable(self.pos_to_id(pos), True)
 
     def rotate(self, screen):
         self.pointy = not self.pointy
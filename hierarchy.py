@@ -0,0 +1,247 @@
+from __future__ import annotations
+from collections import deque
+from frontier import HeapFrontier
+from search import Node, SearchResult, astar_key
+
+
+class HierarchicalMap:
+    # HPA* layer over a HexGrid or SquareGrid. The grid is cut into square
+    # blocks of storage indices (clusters). Where two clusters touch, each
+    # run of crossings gets one or two transitions, a pair of neighbouring
+    # cells on either side of the border. Distances between
+    # the transition cells inside each cluster are found once, so a query
+    # only searches the small graph of transition cells and then fills in
+    # the cells between them.
+    # Paths are close to, but not always, the shortest
+    def __init__(self, grid, cluster_size: int=10) -> None:
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.rows = int(grid.cell_num.y)
+        self.columns = int(grid.cell_num.x)
+        self.cluster_rows = -(-self.rows // cluster_size)
+        self.cluster_columns = -(-self.columns // cluster_size)
+        # (cluster, cluster) with the lower cluster first -> [(cell, cell)]
+        self.transitions: dict[tuple[int, int], list[tuple[int, int]]] = {}
+        # transition cell -> the cells it crosses a border to
+        self.crossings: dict[int, set[int]] = {}
+        # cluster -> transition cell -> {transition cell: distance}
+        self.distances: dict[int, dict[int, dict[int, int]]] = {}
+        self.build()
+
+    def cluster_of(self, cell_id: int) -> int:
+        column, row = divmod(cell_id, self.rows)
+        return (column // self.cluster_size) * self.cluster_rows + row // self.cluster_size
+
+    def cluster_cells(self, cluster: int) -> list[int]:
+        cluster_column, cluster_row = divmod(cluster, self.cluster_rows)
+        size = self.cluster_size
+        rows = range(cluster_row * size, min((cluster_row + 1) * size, self.rows))
+        return [column * self.rows + row
+                for column in range(cluster_column * size, min((cluster_column + 1) * size, self.columns))
+                for row in rows]
+
+    def neighbour_clusters(self, cluster: int) -> list[int]:
+        # hex storage rows are sheared, so clusters can also touch corners
+        cluster_column, cluster_row = divmod(cluster, self.cluster_rows)
+        return [column * self.cluster_rows + row
+                for column in range(max(cluster_column - 1, 0), min(cluster_column + 2, self.cluster_columns))
+                for row in range(max(cluster_row - 1, 0), min(cluster_row + 2, self.cluster_rows))
+                if (column, row) != (cluster_column, cluster_row)]
+
+    def build(self) -> None:
+        for cluster in range(self.cluster_columns * self.cluster_rows):
+            for other in self.neighbour_clusters(cluster):
+                if cluster < other:
+                    self.set_transitions(cluster, other)
+        for cluster in range(self.cluster_columns * self.cluster_rows):
+            self.build_distances(cluster)
+
+    def find_transitions(self, cluster: int, other: int) -> list[tuple[int, int]]:
+        grid = self.grid
+        cluster_of = self.cluster_of
+        # every pair of neighbouring open cells across the border. A hex
+        # cell can face two cells of other, so no pair is dropped
+        pairs = []
+        for cell_id in self.cluster_cells(cluster):
+            if not grid.get_adjacency().passable[cell_id]:
+                continue
+            for neighbour_id in grid.get_neighbour_ids(cell_id):
+                if cluster_of(neighbour_id) == other:
+                    pairs.append((cell_id, neighbour_id))
+
+        # split the pairs into runs that are connected on both sides, so
+        # any crossing of a run can be reached from any other through the
+        # run's own cells. Long runs get a transition at each end and
+        # short ones one in the middle
+        touching: dict[int, set[int]] = {}
+        for cell_id, neighbour_id in pairs:
+            for side in (cell_id, neighbour_id):
+                touching.setdefault(side, set()).add(side)
+                touching[side].update(grid.get_neighbour_ids(side))
+        by_cell: dict[int, list[tuple[int, int]]] = {}
+        for pair in pairs:
+            by_cell.setdefault(pair[0], []).append(pair)
+        transitions = []
+        seen = set()
+        for pair in pairs:
+            if pair in seen:
+                continue
+            run = []
+            stack = [pair]
+            seen.add(pair)
+            while stack:
+                current = stack.pop()
+                run.append(current)
+                cell_id, neighbour_id = current
+                for near in touching[cell_id]:
+                    for linked in by_cell.get(near, ()):
+                        if linked not in seen and linked[1] in touching[neighbour_id]:
+                            seen.add(linked)
+                            stack.append(linked)
+            run.sort()
+            ends = (run[0], run[-1]) if len(run) >= 6 else (run[len(run) // 2],)
+            transitions.extend(ends)
+        return transitions
+
+    def set_transitions(self, cluster: int, other: int) -> None:
+        for cell_id, neighbour_id in self.transitions.pop((cluster, other), ()):
+            self.crossings[cell_id].discard(neighbour_id)
+            self.crossings[neighbour_id].discard(cell_id)
+        transitions = self.find_transitions(cluster, other)
+        if transitions:
+            self.transitions[(cluster, other)] = transitions
+        for cell_id, neighbour_id in transitions:
+            self.crossings.setdefault(cell_id, set()).add(neighbour_id)
+            self.crossings.setdefault(neighbour_id, set()).add(cell_id)
+
+    def search_cluster(self, cluster: int, source: int, target: int=None):
+        # breadth first inside one cluster, every move costs 1
+        grid = self.grid
+        cluster_of = self.cluster_of
+        parents = {source: None}
+        distances = {source: 0}
+        queue = deque([source])
+        while queue:
+            cell_id = queue.popleft()
+            if cell_id == target:
+                break
+            for neighbour_id in grid.get_neighbour_ids(cell_id):
+                if neighbour_id not in parents and cluster_of(neighbour_id) == cluster:
+                    parents[neighbour_id] = cell_id
+                    distances[neighbour_id] = distances[cell_id] + 1
+                    queue.append(neighbour_id)
+        return distances, parents
+
+    def build_distances(self, cluster: int) -> None:
+        cells = [cell_id for cell_id in self.cluster_cells(cluster) if self.crossings.get(cell_id)]
+        distances = {}
+        for cell_id in cells:
+            reached = self.search_cluster(cluster, cell_id)[0]
+            distances[cell_id] = {other: reached[other] for other in cells
+                                  if other != cell_id and other in reached}
+        self.distances[cluster] = distances
+
+    def cell_changed(self, cell_id: int) -> None:
+        # call after cell_id became a wall or floor. Only the borders
+        # between its cluster and the clusters of its neighbours can move,
+        # so a cell away from any border rebuilds a single cluster
+        cluster = self.cluster_of(cell_id)
+        others = {self.cluster_of(neighbour_id)
+                  for neighbour_id in self.grid.geometric_neighbours(*divmod(cell_id, self.rows))}
+        others.discard(cluster)
+        for other in others:
+            self.set_transitions(min(cluster, other), max(cluster, other))
+        for changed in others | {cluster}:
+            self.build_distances(changed)
+
+    def connect(self, cell_id: int, edges: dict[int, dict[int, int]]) -> None:
+        # temporary edges from a start or goal cell to its cluster's
+        # transition cells, added to edges in both directions
+        cluster = self.cluster_of(cell_id)
+        reached = self.search_cluster(cluster, cell_id)[0]
+        for other in self.distances[cluster]:
+            if other != cell_id and other in reached:
+                edges.setdefault(cell_id, {})[other] = reached[other]
+                edges.setdefault(other, {})[cell_id] = reached[other]
+
+    def find_path(self, start, goal) -> SearchResult:
+        grid = self.grid
+        start_id, goal_id = grid.pos_to_id(start), grid.pos_to_id(goal)
+        passable = grid.get_adjacency().passable
+        if not passable[start_id] or not passable[goal_id] or not grid.connected(start, goal):
+            return SearchResult([], False, 0, 0, 0)
+
+        edges: dict[int, dict[int, int]] = {}
+        self.connect(start_id, edges)
+        self.connect(goal_id, edges)
+        if self.cluster_of(start_id) == self.cluster_of(goal_id):
+            reached = self.search_cluster(self.cluster_of(start_id), start_id, goal_id)[0]
+            if goal_id in reached:
+                edges.setdefault(start_id, {})[goal_id] = reached[goal_id]
+
+        # astar over the transition cells
+        positions = {}
+        def get_pos(cell_id):
+            if cell_id not in positions:
+                positions[cell_id] = grid.id_to_pos(cell_id)
+            return positions[cell_id]
+
+        open_list = HeapFrontier(astar_key)
+        open_list.put(start_id, Node(start, None, 0, grid.estimate_remaining_cost(goal, start)))
+        closed = set()
+        expansions, pushes = 0, 1
+        goal_node = None
+        while open_list.qsize() > 0:
+            current = open_list.get()
+            current_id = grid.pos_to_id(current.pos)
+            expansions += 1
+            if current_id == goal_id:
+                goal_node = current
+                break
+            closed.add(current_id)
+            cluster = self.cluster_of(current_id)
+            neighbours = list(self.distances[cluster].get(current_id, {}).items())
+            neighbours.extend((other, 1) for other in self.crossings.get(current_id, ()))
+            neighbours.extend(edges.get(current_id, {}).items())
+            for other, cost in neighbours:
+                if other in closed:
+                    continue
+                global_cost = current.global_cost + cost
+                old_node = open_list.find(other)
+                if old_node is None:
+                    pos = get_pos(other)
+                    open_list.put(other, Node(pos, current, global_cost,
+                                              grid.estimate_remaining_cost(goal, pos), pushes))
+                    pushes += 1
+                elif old_node.global_cost > global_cost:
+                    old_node.update_costs(current, global_cost)
+                    open_list.decrease_key(other, old_node)
+
+        if goal_node is None:
+            return SearchResult([], False, expansions, pushes, 0)
+        return SearchResult(self.refine(goal_node), True, expansions, pushes,
+                            goal_node.global_cost)
+
+    def refine(self, goal_node: Node) -> list:
+        # replace each hop between transition cells with the cells walked
+        grid = self.grid
+        hops = []
+        node = goal_node
+        while node is not None:
+            hops.append(grid.pos_to_id(node.pos))
+            node = node.parent
+        hops.reverse()
+        path = [hops[0]]
+        for source, target in zip(hops, hops[1:]):
+            cluster = self.cluster_of(source)
+            if target in self.crossings.get(source, ()) and self.cluster_of(target) != cluster:
+                path.append(target)
+                continue
+            parents = self.search_cluster(cluster, source, target)[1]
+            cells = []
+            cell_id = target
+            while cell_id != source:
+                cells.append(cell_id)
+                cell_id = parents[cell_id]
+            path.extend(reversed(cells))
+        return [grid.id_to_pos(cell_id) for cell_id in path]
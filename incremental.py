@@ -0,0 +1,208 @@
+from __future__ import annotations
+from collections import deque
+from frontier import HeapFrontier
+from search import Node, SearchObserver, SearchResult, SearchTree
+
+INFINITY = float("inf")
+
+
+class LPANode(Node):
+    # global_cost is g, rhs is the one step lookahead min(g(pred) + cost).
+    # A node is consistent when the two match and only inconsistent nodes
+    # are kept in the open list
+    __slots__ = ("rhs",)
+
+    def __init__(self, pos) -> None:
+        super().__init__(pos, None, INFINITY)
+        self.rhs = INFINITY
+
+
+class LPAStarEngine:
+    # Lifelong Planning A*. Same interface as SearchEngine, but the search
+    # tree is kept between searches: cell_changed() and move_goal() only
+    # reopen the nodes whose costs are affected, and step() then repairs
+    # the tree instead of searching the whole map again
+    def __init__(self, grid, start, goal, selected: str="lpastar",
+                 observer: SearchObserver=None, frontier: str="heap") -> None:
+        self.grid = grid
+        self.selected = selected
+        self.observer = observer
+        self.reset(start, goal)
+
+    def reset(self, start, goal) -> None:
+        self.closed: deque[LPANode] = deque()
+        self.expansions = 0
+        self.pushes = 0
+        self.reset_open(start, goal)
+
+    def reset_open(self, start, goal) -> None:
+        # the tree hangs off the start, so a new start means a new search
+        self.start = start
+        self.goal = goal
+        self.start_id = self.grid.pos_to_id(start)
+        self.goal_id = self.grid.pos_to_id(goal)
+        self.nodes: dict[int, LPANode] = {}
+        # parents for drawing, the repairs work on the nodes
+        self.tree = SearchTree(int(self.grid.get_size()))
+        self.open = HeapFrontier(self.calculate_key)
+        self.current: LPANode = None
+        self.path: deque[LPANode] = deque()
+        self.has_goal = False
+        self.finished = False
+        self.priority_index = 1
+
+        self.update_node(self.start_id)
+
+    @property
+    def trees(self) -> tuple[SearchTree]:
+        return (self.tree,)
+
+    def get_node(self, cell_id: int) -> LPANode:
+        node = self.nodes.get(cell_id)
+        if node is None:
+            node = self.nodes[cell_id] = LPANode(self.grid.id_to_pos(cell_id))
+        return node
+
+    def calculate_key(self, node: LPANode) -> tuple:
+        cost = min(node.global_cost, node.rhs)
+        node.estimated_cost = self.grid.estimate_remaining_cost(self.goal, node.pos)
+        node.total_cost = cost + node.estimated_cost
+        return (node.total_cost, cost)
+
+    def update_node(self, cell_id: int) -> None:
+        grid = self.grid
+        node = self.get_node(cell_id)
+        passable = grid.get_adjacency().passable[cell_id]
+        rhs, parent, parent_id = INFINITY, None, -1
+        if passable and cell_id == self.start_id:
+            rhs = 0
+        elif passable:
+            for neighbour_id in grid.get_neighbour_ids(cell_id):
+                neighbour = self.nodes.get(neighbour_id)
+                if neighbour is None or neighbour.global_cost == INFINITY:
+                    continue
+                cost = neighbour.global_cost + grid.estimate_remaining_cost(node.pos, neighbour.pos)
+                if cost < rhs:
+                    rhs, parent, parent_id = cost, neighbour, neighbour_id
+        node.rhs = rhs
+        node.parent = parent
+        self.tree.parent[cell_id] = parent_id
+
+        if node.global_cost == node.rhs:
+            if cell_id in self.open:
+                self.open.remove(cell_id)
+            return
+        if cell_id in self.open:
+            self.open.decrease_key(cell_id, node)
+        else:
+            node.priority = self.priority_index
+            self.priority_index += 1
+            self.open.put(cell_id, node)
+            self.pushes += 1
+        if self.observer is not None and node.parent is not None:
+            self.observer.on_push(node)
+
+    def is_done(self) -> bool:
+        # an unreachable goal pauses the search, an edit that joins them
+        # up again carries on from where it stopped
+        if self.open.qsize() == 0 or not self.grid.connected(self.start, self.goal):
+            return True
+        goal = self.get_node(self.goal_id)
+        return (goal.global_cost == goal.rhs
+                and self.open.top(1)[0].sort_key >= self.calculate_key(goal))
+
+    def step(self) -> bool:
+        # expands one node, returns False once there is nothing left to do
+        if self.finished:
+            return False
+        if not self.is_done():
+            current = self.current = self.open.get()
+            self.expansions += 1
+            cell_id = self.grid.pos_to_id(current.pos)
+            if current.global_cost > current.rhs:
+                current.global_cost = current.rhs
+            else:
+                # the node got more expensive, reopen it and everything
+                # that might have been using it
+                current.global_cost = INFINITY
+                self.update_node(cell_id)
+            for neighbour_id in self.grid.get_neighbour_ids(cell_id):
+                self.update_node(neighbour_id)
+            self.closed.append(current)
+            # a cell that just became a wall is expanded to close it off,
+            # there is nothing to show for it
+            if self.observer is not None and self.grid.get_adjacency().passable[cell_id]:
+                self.observer.on_expand(current)
+            if not self.is_done():
+                return True
+        return self.finish()
+
+    def finish(self) -> bool:
+        self.finished = True
+        goal = self.get_node(self.goal_id)
+        if goal.global_cost == INFINITY or not self.grid.connected(self.start, self.goal):
+            self.current = None
+            self.has_goal = False
+            self.path.clear()
+            if self.observer is not None:
+                self.observer.on_exhausted()
+            return False
+
+        # walk back along strictly cheaper neighbours, so the path can never
+        # loop even where parents are stale
+        self.has_goal = True
+        self.current = node = goal
+        self.path.clear()
+        cell_id = self.goal_id
+        while node.pos != self.start:
+            self.path.appendleft(node)
+            parent_id = min((i for i in self.grid.get_neighbour_ids(cell_id) if i in self.nodes),
+                            key=lambda i: self.nodes[i].global_cost)
+            self.tree.parent[cell_id] = parent_id
+            node.parent = self.nodes[parent_id]
+            node, cell_id = node.parent, parent_id
+        if self.observer is not None:
+            self.observer.on_goal(goal)
+        return True
+
+    def reopen(self) -> None:
+        self.finished = False
+        self.has_goal = False
+        self.path.clear()
+
+    def cell_changed(self, cell_id: int) -> None:
+        # call after cell_id became a wall or floor, only it and its
+        # neighbours can have a different rhs
+        self.update_node(cell_id)
+        for neighbour_id in self.grid.get_neighbour_ids(cell_id):
+            self.update_node(neighbour_id)
+        # is_done() is also true once the goal is cut off, which leaves the
+        # old path standing, so that reopens too and finish() clears it
+        if not self.is_done() or not self.grid.connected(self.start, self.goal):
+            self.reopen()
+
+    def move_goal(self, start, goal) -> None:
+        if start != self.start:
+            self.reset_open(start, goal)
+            return
+        # g and rhs are costs from the start and stay valid, only the
+        # keys of the open nodes depend on the goal
+        self.goal = goal
+        self.goal_id = self.grid.pos_to_id(goal)
+        nodes = self.open.nodes.values()
+        self.open = HeapFrontier(self.calculate_key)
+        for node in list(nodes):
+            self.open.put(self.grid.pos_to_id(node.pos), node)
+        self.reopen()
+
+    def run(self) -> SearchResult:
+        while self.step():
+            pass
+        return self.result()
+
+    def result(self) -> SearchResult:
+        if not self.has_goal:
+            return SearchResult([], False, self.expansions, self.pushes, 0)
+        path = [self.start] + [node.pos for node in self.path]
+        return SearchResult(path, True, self.expansions, self.pushes,
+                            self.current.global_cost)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+from frontier import HeapFrontier
+from search import Node, SearchEngine, SearchObserver, SearchTree, astar_key
+from sq_grid import SquareGrid
+
+
+class JumpNode(Node):
+    # direction is the (dx, dy) step the node was reached with, None for
+    # the start
+    __slots__ = ("direction",)
+
+    def __init__(self, pos, parent, global_cost, estimated_cost=0,
+                 priority=0, limit=0, direction=None) -> None:
+        super().__init__(pos, parent, global_cost, estimated_cost, priority, limit)
+        self.direction = direction
+
+
+class JumpPointEngine(SearchEngine):
+    # Jump Point Search for the 4 connected SquareGrid. Of all the equally
+    # short paths only the ones that never go vertical and then horizontal
+    # unless a wall forces it are searched, so straight runs are skipped
+    # in one jump and only the cells where a path has to turn go in the
+    # open list. Path costs are the same as astar
+    def __init__(self, grid, start, goal, selected: str="jps",
+                 observer: SearchObserver=None, frontier: str="heap") -> None:
+        if not isinstance(grid, SquareGrid):
+            raise ValueError("jump point search only works on a SquareGrid")
+        super().__init__(grid, start, goal, selected, observer, frontier)
+
+    def reset_open(self, start, goal) -> None:
+        self.start = start
+        self.goal = goal
+        self.columns = int(self.grid.cell_num.x)
+        self.rows = int(self.grid.cell_num.y)
+        self.goal_index = (int(goal.x), int(goal.y))
+        self.open = HeapFrontier(astar_key)
+        estimated_cost = self.grid.estimate_remaining_cost(goal, start)
+        node = JumpNode(start, None, 0, estimated_cost, 0, 5)
+        start_id = self.grid.pos_to_id(start)
+        self.open.put(start_id, node)
+        self.tree.open(start_id, -1, 0)
+        self.pushes += 1
+
+    def is_free(self, x: int, y: int) -> bool:
+        return (0 <= x < self.columns and 0 <= y < self.rows
+                and self.passable[x * self.rows + y])
+
+    def jump_vertical(self, x: int, y: int, dy: int):
+        is_free = self.is_free
+        while True:
+            y += dy
+            if not is_free(x, y):
+                return None
+            if (x, y) == self.goal_index:
+                return x, y
+            # a wall just behind a side cell means turning here is the
+            # only way to get there
+            for side in (-1, 1):
+                if is_free(x + side, y) and not is_free(x + side, y - dy):
+                    return x, y
+
+    def jump_horizontal(self, x: int, y: int, dx: int):
+        is_free = self.is_free
+        while True:
+            x += dx
+            if not is_free(x, y):
+                return None
+            if (x, y) == self.goal_index:
+                return x, y
+            if (self.jump_vertical(x, y, 1) is not None
+                    or self.jump_vertical(x, y, -1) is not None):
+                return x, y
+
+    def get_directions(self, node: JumpNode, x: int, y: int) -> list[tuple[int, int]]:
+        if node.direction is None:
+            return [(-1, 0), (1, 0), (0, -1), (0, 1)]
+        dx, dy = node.direction
+        if dx != 0:
+            return [(dx, 0), (0, -1), (0, 1)]
+        directions = [(0, dy)]
+        for side in (-1, 1):
+            if self.is_free(x + side, y) and not self.is_free(x + side, y - dy):
+                directions.append((side, 0))
+        return directions
+
+    def expand(self, current: JumpNode) -> None:
+        grid = self.grid
+        observer = self.observer
+        tree = self.tree
+        self.passable = grid.get_adjacency().passable
+        x, y = int(current.pos.x), int(current.pos.y)
+        current_id = x * self.rows + y
+        for dx, dy in self.get_directions(current, x, y):
+            if dx != 0:
+                jump_point = self.jump_horizontal(x, y, dx)
+            else:
+                jump_point = self.jump_vertical(x, y, dy)
+            if jump_point is None:
+                continue
+            key = jump_point[0] * self.rows + jump_point[1]
+            if tree.state[key] == SearchTree.CLOSED:
+                continue
+            # floats like the other engines, whose costs come from estimate_remaining_cost
+            global_cost = current.global_cost + float(abs(jump_point[0] - x) + abs(jump_point[1] - y))
+            old_node = self.open.find(key)
+            if old_node is not None:
+                if old_node.global_cost > global_cost:
+                    old_node.update_costs(current, global_cost)
+                    old_node.direction = (dx, dy)
+                    self.open.decrease_key(key, old_node)
+                    tree.open(key, current_id, global_cost)
+                    if observer is not None:
+                        observer.on_decrease_key(old_node)
+            else:
+                adjacent = grid.id_to_pos(key)
+                estimated_remaining_cost = grid.estimate_remaining_cost(self.goal, adjacent)
+                node = JumpNode(adjacent, current, global_cost, estimated_remaining_cost,
+                                self.priority_index, 10, (dx, dy))
+                self.priority_index += 1
+                self.open.put(key, node)
+                tree.open(key, current_id, global_cost)
+                self.pushes += 1
+                if observer is not None:
+                    observer.on_push(node)
+
+    def build_path(self, goal: JumpNode) -> None:
+        # fill in every cell between the jump points so the player still
+        # moves one cell at a time
+        grid = self.grid
+        jump_points = [grid.id_to_pos(cell_id)
+                       for cell_id in reversed(self.tree.path_ids(grid.pos_to_id(goal.pos)))]
+        node = Node(jump_points[0], None, 0)
+        for end in jump_points[1:]:
+            step = (end - node.pos)
+            step /= step.length()
+            while node.pos != end:
+                node = Node(node.pos + step, node, node.global_cost + 1.0)
+                self.path.append(node)
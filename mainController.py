@@ -1,19 +1,60 @@
 import pygame as pg
+from collections import OrderedDict
+
+
+class TextCache:
+    # renders through font once per (text, colour) and keeps the most
+    # recently used surfaces. render() matches Font.render so it can be
+    # passed anywhere a font is expected
+    def __init__(self, font, max_size=2048):
+        self.font = font
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+
+    def render(self, text, antialias, colour):
+        key = (text, antialias, tuple(pg.Color(colour)))
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.font.render(text, antialias, colour)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.max_size:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+    def __getattr__(self, name):
+        # size, get_height etc. come straight from the font
+        return getattr(self.font, name)
+
 
 class mainController:
     CONTROLS_TEXT = "s:start/stop a:fewer walls d:more walls e:next algorithm \
 r:regen positions v:regen map g:restart b:randomise positions"
     CREDITS_TEXT = "Created by Olivia, CompSci BSC 2022/2023 University of Sheffield"
     TOGGLE_TEXT = "f:regen map toggle t:switch algorithms c:show graph overlap \
-c:show graph overlap x:run step by step (press s)"
+c:show graph overlap x:run step by step (press s) n:stepping mode m:map style w:record traces"
+    REPLAY_TEXT = "space:play/pause left/right:step [/]:slower/faster ,/.:jump back/forward \
+0-9:jump to tenths home/end:first/last click the bar to seek"
     TEXT_LEFT_ANCHOR = 20
+    OPEN_LIST_TOP = 100
+    ROW_HEIGHT = 20
 
-    def __init__(self, screen, font, controllers, is_draw_ui=True):
+    def __init__(self, screen, font, controllers, is_draw_ui=True,
+                 key_interval: int=100, replay=None):
         self.screen = screen
+        # a trace_replay.TraceReplay shown instead of the controllers
+        self.replay = replay
         self.CENTER = pg.Vector2(screen.get_size()) / 2
         self.controllers = controllers
-        self.font = font
+        self.font = TextCache(font)
         self.is_draw_ui = is_draw_ui
+        self.interval = key_interval
+        self.lastTime = {pg.K_UP: 0, pg.K_DOWN: 0, pg.K_PAGEUP: 0,
+                         pg.K_PAGEDOWN: 0}
+        # first open list entry shown, rows below the controls text are cut
+        self.open_list_offset = 0
+        self.open_list_rows = (screen.get_height() - 60 - self.OPEN_LIST_TOP) // self.ROW_HEIGHT
 
     def write_iteration_counter(self, controller):
         text = self.font.render(f"iterations: {controller.agent.iteration}", 1, (255, 0, 0))
@@ -30,19 +71,42 @@ c:show graph overlap x:run step by step (press s)"
 
     def write_current_node(self, controller):
         if controller.agent.open.qsize() > 0:
-            text = self.font.render(str(f"Current Node: {controller.agent.open.queue[0].pos}"), 1, (255,0,0))
+            text = self.font.render(str(f"Current Node: {controller.agent.open.top(1)[0].pos}"), 1, (255,0,0))
         else:
             text = self.font.render(str(f"Current List: None"), 1, (255,0,0))
         self.screen.blit(text, pg.Vector2(self.TEXT_LEFT_ANCHOR, 60))
 
     def write_open_list(self, controller):
+        # only the rows that fit on screen are rendered, in the order the
+        # agent will expand them
+        open_list = controller.agent.open
+        size = open_list.qsize()
+        self.open_list_offset = max(0, min(self.open_list_offset, size - self.open_list_rows))
         text = self.font.render("Open List,     Priority, Total Cost", 1, (255,0,0))
         self.screen.blit(text, pg.Vector2(self.TEXT_LEFT_ANCHOR, 80))
-        for i, node in enumerate(controller.agent.open.queue):
+        if size > self.open_list_rows:
+            last = min(self.open_list_offset + self.open_list_rows, size)
+            text = self.font.render(f"{self.open_list_offset+1}-{last}/{size}", 1, (255,0,0))
+            self.screen.blit(text, pg.Vector2(self.TEXT_LEFT_ANCHOR+340, 80))
+        nodes = open_list.top(self.open_list_rows, self.open_list_offset)
+        for i, node in enumerate(nodes):
             text = self.font.render(
                 f"{str(node.pos):<14} {node.priority:>8} {node.total_cost:>11}",
                 1, (255, 0, 0))
-            self.screen.blit(text, pg.Vector2(self.TEXT_LEFT_ANCHOR, 100+i*20))
+            self.screen.blit(text, pg.Vector2(self.TEXT_LEFT_ANCHOR,
+                                              self.OPEN_LIST_TOP+i*self.ROW_HEIGHT))
+
+    def check_keys(self):
+        # scrolls the open list, write_open_list keeps the offset in range
+        keys = pg.key.get_pressed()
+        steps = {pg.K_UP: -1, pg.K_DOWN: 1, pg.K_PAGEUP: -self.open_list_rows,
+                 pg.K_PAGEDOWN: self.open_list_rows}
+        for key, step in steps.items():
+            if keys[key] and pg.time.get_ticks() > self.interval + self.lastTime[key]:
+                self.open_list_offset = max(0, self.open_list_offset + step)
+                self.lastTime[key] = pg.time.get_ticks()
+        if keys[pg.K_HOME]:
+            self.open_list_offset = 0
 
     def write_algorithm_title(self, controller):
         title = controller.agent.selected.upper()
@@ -104,10 +168,33 @@ c:show graph overlap x:run step by step (press s)"
 
     def draw_UI(self, controller):
         self.draw_statistics(controller)
-        self.write_open_list(controller)
         controller.grid.draw_axes(self.screen, self.font)
 
+    def write_replay_status(self, replay):
+        reader = replay.reader
+        text = self.font.render(f"{reader.selected.upper()} replay ({replay.cost:.0f})", 1, (255, 0, 0))
+        self.screen.blit(text, pg.Vector2(self.CENTER.x-text.get_width()/2, 10))
+        state = "playing" if replay.playing else "paused"
+        lines = (f"Goal: {replay.goal}",
+                 f"event: {replay.index}/{len(replay)} ({replay.progress():.1%})",
+                 f"speed: {replay.speed} events/s, {state}")
+        for i, line in enumerate(lines):
+            text = self.font.render(line, 1, (255, 0, 0))
+            self.screen.blit(text, pg.Vector2(self.TEXT_LEFT_ANCHOR, 20 + i*self.ROW_HEIGHT))
+
+        text = self.font.render(self.REPLAY_TEXT, 1, (255, 0, 0))
+        self.screen.blit(text, self.CENTER + pg.Vector2(-text.get_width()/2, self.CENTER.y-58))
+
     def update(self, dt):
+        if self.replay is not None:
+            self.replay.update(self.screen, dt)
+            self.write_replay_status(self.replay)
+            self.write_credits()
+            pg.display.flip()
+            return
+
+        if self.is_draw_ui:
+            self.check_keys()
 
         for controller in self.controllers:
             controller.update(self.screen, dt)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import numpy as np
+
+# seeded map generators. Every generator works on the storage indices of a
+# grid (column, row) and returns a flat bool array indexed by cell id,
+# True for open cells. The work is done as whole array operations, so a
+# 1000x1000 map takes a fraction of a second.
+# Hex grids store their rows sheared, so mazes come out slanted there and
+# a few cells touch across corners, but every open cell is still reachable
+
+
+def sample_walls(candidates: np.ndarray, number_of_walls: int, seed: int) -> np.ndarray:
+    # ids of number_of_walls cells picked without replacement from the True
+    # cells of candidates
+    candidates = np.flatnonzero(candidates)
+    number_of_walls = min(number_of_walls, len(candidates))
+    rng = np.random.default_rng(seed)
+    return rng.choice(candidates, number_of_walls, replace=False)
+
+
+def caves(columns: int, rows: int, seed: int, fill: float=0.45, steps: int=4) -> np.ndarray:
+    # cellular automaton: start from noise, then a cell becomes a wall when
+    # five of its eight neighbours are walls, or four if it already is one.
+    # Outside the map counts as wall so caves close off at the edges
+    rng = np.random.default_rng(seed)
+    walls = rng.random((columns, rows)) < fill
+    for _ in range(steps):
+        padded = np.pad(walls, 1, constant_values=True)
+        count = np.zeros((columns, rows), dtype=np.uint8)
+        for dx in range(3):
+            for dy in range(3):
+                if dx != 1 or dy != 1:
+                    count += padded[dx:dx + columns, dy:dy + rows]
+        walls = (count >= 5) | (walls & (count >= 4))
+    return ~walls.ravel()
+
+
+def maze_shape(columns: int, rows: int) -> tuple[int, int]:
+    # maze rooms sit on even storage indices with a wall or a passage
+    # between each pair of neighbouring rooms
+    return (columns + 1) // 2, (rows + 1) // 2
+
+
+def division_maze(columns: int, rows: int, seed: int) -> np.ndarray:
+    # recursive division. Every chamber at one depth is split at the same
+    # time, so the loop runs once per depth instead of once per chamber
+    rng = np.random.default_rng(seed)
+    width, height = maze_shape(columns, rows)
+    cells = np.zeros((columns, rows), dtype=np.bool_)
+    cells[:2 * width - 1, :2 * height - 1] = True
+    # chambers in rooms, (x, y, w, h)
+    x = np.zeros(1, dtype=np.int64)
+    y = np.zeros(1, dtype=np.int64)
+    w = np.full(1, width, dtype=np.int64)
+    h = np.full(1, height, dtype=np.int64)
+    while len(x):
+        split = (w > 1) | (h > 1)
+        x, y, w, h = x[split], y[split], w[split], h[split]
+        if not len(x):
+            break
+        # split across the longer side, either way for squares
+        vertical = (w > h) | ((w == h) & (rng.random(len(x)) < 0.5))
+        across = np.where(vertical, w, h)
+        along = np.where(vertical, h, w)
+        # the wall goes after room `at` of the split side, gap is a room index
+        at = (rng.random(len(x)) * (across - 1)).astype(np.int64)
+        gap = (rng.random(len(x)) * along).astype(np.int64)
+
+        # one wall per chamber, 2 * along - 1 cells long
+        lengths = 2 * along - 1
+        starts = np.cumsum(lengths) - lengths
+        offsets = np.arange(lengths.sum()) - np.repeat(starts, lengths)
+        line = np.repeat(np.where(vertical, 2 * (x + at) + 1, 2 * (y + at) + 1), lengths)
+        first = np.repeat(np.where(vertical, 2 * y, 2 * x), lengths)
+        is_vertical = np.repeat(vertical, lengths)
+        cells[np.where(is_vertical, line, first + offsets),
+              np.where(is_vertical, first + offsets, line)] = False
+        gap_line = np.where(vertical, 2 * (x + at) + 1, 2 * (y + at) + 1)
+        gap_cell = np.where(vertical, 2 * (y + gap), 2 * (x + gap))
+        cells[np.where(vertical, gap_line, gap_cell),
+              np.where(vertical, gap_cell, gap_line)] = True
+
+        # both halves of every chamber go to the next depth
+        before = at + 1
+        after = across - before
+        x = np.concatenate((x, np.where(vertical, x + before, x)))
+        y = np.concatenate((y, np.where(vertical, y, y + before)))
+        w, h = (np.concatenate((np.where(vertical, before, w), np.where(vertical, after, w))),
+                np.concatenate((np.where(vertical, h, before), np.where(vertical, h, after))))
+    return cells.ravel()
+
+
+def prim_maze(columns: int, rows: int, seed: int) -> np.ndarray:
+    # the minimum spanning tree of the rooms under random passage weights,
+    # the maze Prim's algorithm grows for those weights. Built with Boruvka
+    # rounds, each joining every tree to the one across its cheapest
+    # passage, which takes about log2(rooms) array passes
+    rng = np.random.default_rng(seed)
+    width, height = maze_shape(columns, rows)
+    rooms = np.arange(width * height).reshape(width, height)
+    room_x, room_y = np.divmod(rooms, height)
+    # passages to the next room along and down, and the cell between
+    first = np.concatenate((rooms[:-1, :].ravel(), rooms[:, :-1].ravel()))
+    second = np.concatenate((rooms[1:, :].ravel(), rooms[:, 1:].ravel()))
+    cell_x = room_x.ravel()[first] * 2 + np.concatenate(
+        (np.ones((width - 1) * height, dtype=np.int64), np.zeros(width * (height - 1), dtype=np.int64)))
+    cell_y = room_y.ravel()[first] * 2 + np.concatenate(
+        (np.zeros((width - 1) * height, dtype=np.int64), np.ones(width * (height - 1), dtype=np.int64)))
+    # sorted by weight, so a passage's index is its weight
+    order = rng.permutation(len(first))
+    first, second, cell_x, cell_y = first[order], second[order], cell_x[order], cell_y[order]
+
+    cells = np.zeros((columns, rows), dtype=np.bool_)
+    cells[::2, ::2][:width, :height] = True
+    tree = np.arange(width * height)
+    weights = np.arange(len(first))
+    no_passage = len(first)
+    while True:
+        tree_a, tree_b = tree[first[weights]], tree[second[weights]]
+        crossing = tree_a != tree_b
+        weights, tree_a, tree_b = weights[crossing], tree_a[crossing], tree_b[crossing]
+        if not len(weights):
+            break
+        cheapest = np.full(len(tree), no_passage)
+        np.minimum.at(cheapest, tree_a, weights)
+        np.minimum.at(cheapest, tree_b, weights)
+        chosen = np.unique(cheapest[cheapest < no_passage])
+        cells[cell_x[chosen], cell_y[chosen]] = True
+
+        # every tree points at the tree across its cheapest passage. Two
+        # trees sharing a passage point at each other, the lower one
+        # becomes the root, then pointers are followed to the roots
+        ends = np.flatnonzero(cheapest < no_passage)
+        pointer = np.arange(len(tree))
+        pointer[ends] = tree[first[cheapest[ends]]] + tree[second[cheapest[ends]]] - ends
+        mutual = (pointer[pointer] == np.arange(len(tree))) & (np.arange(len(tree)) < pointer)
+        pointer[mutual] = np.flatnonzero(mutual)
+        while True:
+            jumped = pointer[pointer]
+            if np.array_equal(jumped, pointer):
+                break
+            pointer = jumped
+        tree = pointer[tree]
+    return cells.ravel()
+
+
+GENERATORS = {"caves": caves, "division": division_maze, "prim": prim_maze}
+
+
+def generate(style: str, columns: int, rows: int, seed: int) -> np.ndarray:
+    if style not in GENERATORS:
+        raise ValueError(f"unknown map style {style!r}, expected one of {tuple(GENERATORS)}")
+    return GENERATORS[style](columns, rows, seed)
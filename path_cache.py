@@ -0,0 +1,31 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Hashable
+
+
+class PathCache:
+    # least recently used finished searches. Keys start with the grid's map
+    # version, which changes on every wall edit, so stale entries are never
+    # hit again and just age out
+    def __init__(self, max_size: int=32) -> None:
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, entry) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
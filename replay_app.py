@@ -0,0 +1,37 @@
+# replays a search recorded with the w key or GameController(trace_dir=...)
+# usage: python replay_app.py traces/<file>.pftrace
+import sys
+import pygame as pg
+from mainController import mainController
+from trace_file import TraceReader
+from trace_replay import TraceReplay, make_grid
+
+if len(sys.argv) != 2:
+    sys.exit(f"usage: python {sys.argv[0]} TRACE")
+
+# pg setup
+pg.init()
+screen = pg.display.set_mode((1600, 768))
+
+# the map fills the space between the status text and the controls
+reader = TraceReader(sys.argv[1])
+grid = make_grid(reader, pg.Rect(360, 40, screen.get_width() - 400, screen.get_height() - 140))
+replay = TraceReplay(screen, reader, grid)
+
+font = pg.font.SysFont('Consolas', 16)
+main_controller = mainController(screen, font, [], replay=replay)
+
+clock = pg.time.Clock()
+running = True
+dt = 0
+while running:
+    for event in pg.event.get():
+        if event.type == pg.QUIT:
+            running = False
+
+    screen.fill((0,0,16))
+    dt = clock.tick(60)
+    main_controller.update(dt)
+
+reader.close()
+pg.quit()
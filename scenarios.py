@@ -0,0 +1,44 @@
+import random
+from pygame import Vector2
+from grid import HexGrid
+from sq_grid import SquareGrid
+
+GRID_TYPES = ("hex", "square")
+BACKENDS = ("objects", "array")
+STRATEGIES = ("bfs", "dfs", "bestFirst", "astar", "iterative")
+
+
+def make_grid(kind: str, width: int, height: int, backend: str="objects"):
+    if backend == "array":
+        # numpy is only needed for the array backend
+        from array_grid import ArrayHexGrid as hex_grid, ArraySquareGrid as square_grid
+    elif backend == "objects":
+        hex_grid, square_grid = HexGrid, SquareGrid
+    else:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+    # the center only matters for drawing, headless runs never look at it
+    if kind == "hex":
+        return hex_grid(Vector2(width, height), Vector2(0, 0), size=30)
+    if kind == "square":
+        return square_grid(Vector2(width, height), Vector2(0, 0), size=Vector2(30, 30))
+    raise ValueError(f"unknown grid type {kind!r}, expected one of {GRID_TYPES}")
+
+
+def make_scenario(kind: str, width: int, height: int, density: float, seed: int,
+                  backend: str="objects", style: str="walls"):
+    # same seed gives the same map, start and goal on every run. Styles
+    # other than walls come from mapgen and ignore density
+    random.seed(seed)
+    grid = make_grid(kind, width, height, backend)
+    if style != "walls":
+        grid.generate_map(style)
+    goal_pos = grid.random_pos()
+    start_pos = grid.random_pos()
+    while start_pos == goal_pos:
+        start_pos = grid.random_pos()
+    if style == "walls":
+        grid.generate_walls(int(grid.get_size() * density), goal_pos, start_pos)
+    # build the neighbour table and labels now so they are not counted as
+    # search time
+    grid.get_components()
+    return grid, start_pos, goal_pos
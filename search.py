@@ -0,0 +1,309 @@
+from __future__ import annotations
+from array import array
+from collections import deque
+from pygame import math
+from frontier import BucketFrontier, FifoFrontier, HeapFrontier, LifoFrontier
+
+
+class Node:
+    __slots__ = ("pos", "parent", "global_cost", "estimated_cost",
+                 "total_cost", "priority", "limit", "sort_key")
+
+    def __init__(self, pos: math._GenericVector,  parent: Node,
+                 global_cost: float, estimated_cost: float=0,
+                 priority: int=0, limit=0) -> None:
+        self.pos = pos
+        self.parent = parent
+
+        self.global_cost = global_cost
+        self.estimated_cost = estimated_cost
+        self.total_cost = global_cost + estimated_cost
+
+        self.priority = priority
+        self.sort_key = None
+        self.limit = limit
+        if self.parent is not None:
+            if (self.limit < self.parent.limit):
+                self.limit = self.parent.limit
+            if (self.global_cost > self.parent.limit):
+                self.limit += limit
+
+    def update_costs(self, parent: Node, global_cost: float):
+        self.global_cost = global_cost
+        self.total_cost = global_cost + self.estimated_cost
+        self.parent = parent
+
+
+# sort keys for each strategy, the frontier orders nodes by these tuples so
+# comparisons never call back into python. Every key ends with the node's
+# unique priority, later nodes win ties unless the strategy says otherwise
+def astar_key(node: Node) -> tuple:
+    return (node.total_cost, node.global_cost, -node.priority)
+
+def bfs_key(node: Node) -> tuple:
+    return (node.priority,)
+
+def dfs_key(node: Node) -> tuple:
+    return (-node.priority,)
+
+def best_first_key(node: Node) -> tuple:
+    return (node.estimated_cost, -node.priority)
+
+def iterative_deepening_key(node: Node) -> tuple:
+    return (node.limit, -node.priority)
+
+SORT_KEYS = {"dfs": dfs_key, "bfs": bfs_key, "astar": astar_key,
+             "bestFirst": best_first_key, "iterative": iterative_deepening_key}
+
+# bfs and dfs only ever order on insertion, so they skip the heap entirely
+# and get O(1) push and pop from a queue or a stack
+FRONTIERS = {"bfs": FifoFrontier, "dfs": LifoFrontier}
+
+
+# bucket numbers for the strategies that can use BucketFrontier. Every step
+# costs 1 and both heuristics are whole numbers so the keys are integers.
+# g never exceeds f as the heuristics are never negative, so (f, g) can be
+# laid out as one increasing index: all of f=0, then f=1 with g=0..1 ...
+def astar_bucket(sort_key: tuple) -> int:
+    total_cost, global_cost = sort_key[0], sort_key[1]
+    return total_cost * (total_cost + 1) // 2 + global_cost
+
+def best_first_bucket(sort_key: tuple) -> int:
+    return sort_key[0]
+
+BUCKET_INDEXES = {"astar": astar_bucket, "bestFirst": best_first_bucket}
+FRONTIER_TYPES = ("heap", "bucket")
+
+
+def make_frontier(selected: str, frontier: str="heap"):
+    # frontier="bucket" only changes astar and bestFirst, the other
+    # strategies keep their usual frontier
+    if frontier not in FRONTIER_TYPES:
+        raise ValueError(f"unknown frontier {frontier!r}, expected one of {FRONTIER_TYPES}")
+    if selected in FRONTIERS:
+        return FRONTIERS[selected]()
+    if frontier == "bucket" and selected in BUCKET_INDEXES:
+        return BucketFrontier(SORT_KEYS[selected], BUCKET_INDEXES[selected])
+    return HeapFrontier(SORT_KEYS[selected])
+
+
+class SearchTree:
+    # search state in flat arrays indexed by cell id: the parent's id (-1
+    # for none), g, and whether the cell is open or closed. Engines write
+    # it, the agent's trail and the grid's overlay read it
+    UNSEEN, OPEN, CLOSED = 0, 1, 2
+
+    def __init__(self, size: int) -> None:
+        self.parent = array('i', [-1]) * size
+        self.cost = array('d', [0]) * size
+        self.state = bytearray(size)
+
+    def open(self, cell_id: int, parent_id: int, cost: float) -> None:
+        self.parent[cell_id] = parent_id
+        self.cost[cell_id] = cost
+        self.state[cell_id] = self.OPEN
+
+    def close(self, cell_id: int) -> None:
+        self.state[cell_id] = self.CLOSED
+
+    def path_ids(self, cell_id: int) -> list[int]:
+        # cell_id and its ancestors, root last. Capped at one visit per
+        # cell in case stale parents loop
+        parent = self.parent
+        ids = []
+        for _ in range(len(parent)):
+            if cell_id < 0:
+                break
+            ids.append(cell_id)
+            cell_id = parent[cell_id]
+        return ids
+
+    def copy(self) -> SearchTree:
+        tree = SearchTree.__new__(SearchTree)
+        tree.parent = self.parent[:]
+        tree.cost = self.cost[:]
+        tree.state = self.state[:]
+        return tree
+
+
+class SearchObserver:
+    # receives search events, the visualiser overrides these to draw
+    def on_push(self, node: Node) -> None:
+        pass
+
+    def on_decrease_key(self, node: Node) -> None:
+        pass
+
+    def on_expand(self, node: Node) -> None:
+        pass
+
+    def on_goal(self, node: Node) -> None:
+        pass
+
+    def on_exhausted(self) -> None:
+        pass
+
+
+class SearchResult:
+    def __init__(self, path: list, found: bool, expansions: int,
+                 pushes: int, path_cost: float) -> None:
+        # path holds every position from start to goal inclusive
+        self.path = path
+        self.found = found
+        self.expansions = expansions
+        self.pushes = pushes
+        self.path_cost = path_cost
+
+    def get_efficiency(self) -> float:
+        # same as Agent.get_efficiency, moves on the path per expanded node
+        if not self.found or self.expansions == 0:
+            return 0
+        return (len(self.path) - 1) / self.expansions
+
+    def __repr__(self) -> str:
+        return (f"SearchResult(found={self.found}, "
+                f"length={len(self.path)}, cost={self.path_cost}, "
+                f"expansions={self.expansions}, pushes={self.pushes})")
+
+
+class SearchEngine:
+    # runs one of the strategies in SORT_KEYS on a grid, one expansion per
+    # step(). It never touches colours or the display, anything visual is
+    # done by the optional observer
+    def __init__(self, grid, start, goal, selected: str="astar",
+                 observer: SearchObserver=None, frontier: str="heap") -> None:
+        self.grid = grid
+        self.selected = selected
+        self.observer = observer
+        self.frontier = frontier
+        self.reset(start, goal)
+
+    def reset(self, start, goal) -> None:
+        # nodes only live while they are open, the tree keeps the rest
+        self.tree = SearchTree(int(self.grid.get_size()))
+        self.closed = array('i')
+        self.current: Node = None
+        self.path: deque[Node] = deque()
+
+        self.has_goal = False
+        self.finished = False
+        self.expansions = 0
+        self.pushes = 0
+        self.priority_index = 1
+
+        self.reset_open(start, goal)
+
+    def reset_open(self, start, goal) -> None:
+        self.start = start
+        self.goal = goal
+        self.open = make_frontier(self.selected, self.frontier)
+        estimated_cost = self.grid.estimate_remaining_cost(goal, start)
+        node = Node(start, None, 0, estimated_cost, 0, 5)
+        start_id = self.grid.pos_to_id(start)
+        self.open.put(start_id, node)
+        self.tree.open(start_id, -1, 0)
+        self.pushes += 1
+
+    def expand(self, current: Node) -> None:
+        grid = self.grid
+        observer = self.observer
+        tree = self.tree
+        state = tree.state
+        current_id = grid.pos_to_id(current.pos)
+        for key in grid.get_neighbour_ids(current_id):
+            if state[key] == SearchTree.CLOSED:
+                continue
+            old_node = self.open.find(key)
+            if old_node is not None:
+                global_cost = current.global_cost + grid.estimate_remaining_cost(old_node.pos, current.pos)
+                if old_node.global_cost > global_cost:
+                    old_node.update_costs(current, global_cost)
+                    self.open.decrease_key(key, old_node)
+                    tree.open(key, current_id, global_cost)
+                    if observer is not None:
+                        observer.on_decrease_key(old_node)
+            else:
+                adjacent = grid.id_to_pos(key)
+                global_cost = current.global_cost + grid.estimate_remaining_cost(adjacent, current.pos)
+                estimated_remaining_cost = grid.estimate_remaining_cost(self.goal, adjacent)
+                node = Node(adjacent, current, global_cost,
+                            estimated_remaining_cost, self.priority_index, 10)
+                self.priority_index += 1
+                self.open.put(key, node)
+                tree.open(key, current_id, global_cost)
+                self.pushes += 1
+                if observer is not None:
+                    observer.on_push(node)
+
+    @property
+    def trees(self) -> tuple[SearchTree]:
+        # every tree the engine draws, bidirectional search has two
+        return (self.tree,)
+
+    def cell_changed(self, cell_id: int) -> None:
+        # a plain search carries on with the map it started on
+        pass
+
+    def move_goal(self, start, goal) -> None:
+        self.reset_open(start, goal)
+
+    def step(self) -> bool:
+        # expands one node, returns False once there is nothing left to do
+        if self.finished:
+            return False
+
+        # a goal walled off from the start is given up on straight away,
+        # not after expanding everything the start can reach
+        if self.open.qsize() == 0 or not self.grid.connected(self.start, self.goal):
+            self.current = None
+            self.finished = True
+            if self.observer is not None:
+                self.observer.on_exhausted()
+            return False
+
+        current = self.current = self.open.get()
+        self.expansions += 1
+        self.expand(current)
+        if self.observer is not None:
+            self.observer.on_expand(current)
+
+        if current.pos == self.goal:
+            self.has_goal = True
+            self.finished = True
+            self.build_path(current)
+            if self.observer is not None:
+                self.observer.on_goal(current)
+
+        current_id = self.grid.pos_to_id(current.pos)
+        self.closed.append(current_id)
+        self.tree.close(current_id)
+        # the tree has its parent, dropping the link lets closed nodes go
+        current.parent = None
+        return True
+
+    def build_path(self, goal: Node) -> None:
+        # every cell after the start, the goal node itself comes last
+        grid = self.grid
+        cost = self.tree.cost
+        ids = self.tree.path_ids(grid.pos_to_id(goal.pos))
+        for cell_id in reversed(ids[1:-1]):
+            self.path.append(Node(grid.id_to_pos(cell_id), None, cost[cell_id]))
+        if len(ids) > 1:
+            self.path.append(goal)
+
+    def run(self) -> SearchResult:
+        while self.step():
+            pass
+        return self.result()
+
+    def result(self) -> SearchResult:
+        if not self.has_goal:
+            return SearchResult([], False, self.expansions, self.pushes, 0)
+        path = [self.start] + [node.pos for node in self.path]
+        return SearchResult(path, True, self.expansions, self.pushes,
+                            self.current.global_cost)
+
+
+def search(grid, start, goal, selected: str="astar",
+           observer: SearchObserver=None, frontier: str="heap") -> SearchResult:
+    return SearchEngine(grid, start, goal, selected, observer, frontier).run()
@@ -1,11 +1,10 @@
-from pygame import Vector2, Color, draw, surface, Rect
+from pygame import Vector2, Color, draw, Rect
 from grid import Grid
 
 class Cell(Vector2):
-    def __init__(self, pos: float, size: Vector2, colour: Color=Color(0,168,32), parent_pos = None) -> None:
+    def __init__(self, pos: float, size: Vector2, colour: Color=Color(0,168,32)) -> None:
         super().__init__(pos)
         self.colour = colour
-        self.parent_pos = parent_pos
         self.size = size
 
     def copy_cell(self):
@@ -26,21 +25,21 @@ class Cell(Vector2):
         draw.rect(screen, cell.colour, dimensions)
         draw.rect(screen, Color("black"), dimensions, 1)
 
+    @staticmethod
+    def erase(screen, size, coords, colour):
+        corner = coords - size/2
+        draw.rect(screen, colour, Rect(corner.x, corner.y, size.x, size.y))
+
 class SquareGrid(Grid):
+    MAX_NEIGHBOURS = 4
+    OFFSETS = ((-1, 0), (0, -1), (0, 1), (1, 0))
+
     def __init__(self, cell_num:Vector2, center: Vector2,
                  colour: Color=Color(0,168,32), size: Vector2= Vector2(40, 40), overlay=False) -> None:
         super().__init__(cell_num, center, Cell, colour, size, overlay)
 
-    def get_neighbours(self, pos):
-        neighbours = []
-        for i in [-1, 0, 1]:
-            for j in [-1, 0, 1]:
-                if abs(i) != abs(j) and (abs(i) == 1 or abs(j) == 1):
-                    rel_pos = pos + Vector2(i, j)
-                    if self.is_valid_pos(rel_pos) and self.cells[int(rel_pos.x)][int(rel_pos.y)] is not None:
-                        # if ((i == j and i != 0) or i != j) and self.is_valid_pos(pos + Vector2(i, j)):
-                        neighbours.append(pos + Vector2(i, j))
-        return neighbours
+    def neighbour_row(self, column, row, i: int, j: int):
+        return row + j
 
     def estimate_remaining_cost(self, pos_1: Vector2, pos_2: Vector2):
         distance: Vector2 = (pos_1 - pos_2)
@@ -62,20 +61,6 @@ class SquareGrid(Grid):
     def coords_to_pos(self, coords: Vector2) -> Vector2:
         return round((coords - self.start_pos).elementwise() / self.size)
 
-    def draw(self, screen: surface):
-        for col in self.cells:
-            for cell in col:
-                if cell is not None:
-                    coords = self.pos_to_coords(cell)
-                    self.cell.draw(screen, cell, coords)
-        if self.overlay:
-            for col in self.cells:
-                for cell in col:
-                    if cell is not None and cell.parent_pos is not None:
-                        start_pos = self.pos_to_coords(cell)
-                        end_pos = self.pos_to_coords(cell.parent_pos)
-                        draw.line(screen, (255, 255, 255), start_pos, end_pos)
-
     def draw_trail(self, screen, pos):
         coords = self.pos_to_coords(pos)
         coords -= self.size/2
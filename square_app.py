@@ -1,7 +1,7 @@
 # Example file showing a circle moving on screen
 import pygame as pg
 from sq_grid import SquareGrid
-from gameController import GameController
+from gameController import GameController, SQUARE_CHOICES
 from mainController import mainController
 
 # pg setup
@@ -15,7 +15,8 @@ grid = SquareGrid(pg.Vector2(30, 20), CENTER+(180,0), size=pg.Vector2(30,30))
 goal_pos = grid.random_pos()
 wall_num = int(grid.get_size()*0.1)
 controller = GameController(screen, grid, goal_pos, is_random_start=False,
-                            wall_num=wall_num, is_regenerate=False)
+                            wall_num=wall_num, is_regenerate=False,
+                            choices=SQUARE_CHOICES)
 
 font = pg.font.SysFont('Consolas', 16)
 main_controller = mainController(screen, font, [controller])
@@ -1,7 +1,7 @@
 # Example file showing a circle moving on screen
 import pygame as pg
-from sq_grid import SquareGrid
-from gameController import GameController
+from array_grid import ArraySquareGrid
+from gameController import GameController, SQUARE_CHOICES
 from mainController import mainController
 
 # pg setup
@@ -12,23 +12,26 @@ CENTER = pg.Vector2(screen.get_width(), screen.get_height()) / 2
 # create grid
 size = pg.Vector2(30,30)
 grid_pos = CENTER-pg.Vector2(17*15, 0)
-grid = SquareGrid(pg.Vector2(15, 20), grid_pos, size=size)
+grid = ArraySquareGrid(pg.Vector2(15, 20), grid_pos, size=size)
 goal_pos = grid.random_pos()
 
 wall_num = int(grid.get_size()*0.07)
 controller = GameController(screen, grid, goal_pos, "bestFirst",
                             is_random_start=False, change_agent_type=False,
-                            wait_time=2500, wall_num=wall_num)
+                            wait_time=2500, wall_num=wall_num,
+                            choices=SQUARE_CHOICES)
 
 grid_pos = CENTER+pg.Vector2(17*15, 0)
-grid2 = SquareGrid(pg.Vector2(15, 20), grid_pos, size=size)
-grid2.cells = grid.copy()
+# both panes show one shared map, each keeps its own colours
+grid2 = ArraySquareGrid(pg.Vector2(15, 20), grid_pos, size=size)
+grid2.share_map(grid)
 
 controller2 = GameController(screen, grid2, goal_pos, "astar",
                              is_random_start=False, change_agent_type=False,
-                             wait_time=2500, wall_num=wall_num)
+                             wait_time=2500, wall_num=wall_num,
+                             choices=SQUARE_CHOICES)
 
-controller2.grid.cells = controller.grid.copy()
+controller2.grid.share_map(controller.grid)
 controller2.agent.reset_open()
 
 font = pg.font.SysFont('Consolas', 16)
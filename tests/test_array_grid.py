@@ -0,0 +1,44 @@
+import random
+from scenarios import make_scenario
+
+
+def toggle(grid, cell_id):
+    pos = grid.id_to_pos(cell_id)
+    if grid.get_cell(pos) is not None:
+        grid.clear_cell(pos)
+    else:
+        grid.new_cell(pos)
+
+
+def test_lone_map_is_patched_in_place():
+    grid, _, _ = make_scenario("hex", 20, 15, 0.3, seed=1, backend="array")
+    shared = grid.cells.map
+    rng = random.Random(1)
+    for _ in range(50):
+        version = grid.version
+        toggle(grid, rng.randrange(int(grid.get_size())))
+        assert grid.cells.map is shared
+        assert grid.version != version
+    # the patched tables match ones built from scratch
+    adjacency, components = grid.get_adjacency(), grid.get_components()
+    fresh, _, _ = make_scenario("hex", 20, 15, 0.3, seed=1, backend="array")
+    fresh.load_map(grid.get_passable())
+    for cell_id in range(int(grid.get_size())):
+        assert list(adjacency.neighbours(cell_id)) == list(fresh.get_adjacency().neighbours(cell_id))
+        for other in (0, cell_id // 2):
+            assert (components.connected(cell_id, other, adjacency)
+                    == fresh.get_components().connected(cell_id, other, fresh.get_adjacency()))
+
+
+def test_shared_map_is_copied_on_write():
+    grid, _, _ = make_scenario("square", 20, 15, 0.3, seed=2, backend="array")
+    other, _, _ = make_scenario("square", 20, 15, 0.3, seed=3, backend="array")
+    other.share_map(grid)
+    before = grid.get_passable()
+    toggle(other, 7)
+    assert grid.get_passable() == before
+    assert other.get_passable() != before
+    # the other grid holds its own map now, so its next edit is in place
+    shared = other.cells.map
+    toggle(other, 8)
+    assert other.cells.map is shared
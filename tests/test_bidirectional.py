@@ -0,0 +1,27 @@
+import pytest
+from bidirectional import BidirectionalEngine
+from scenarios import make_scenario
+from search import SearchEngine
+
+
+def is_valid_path(grid, path, start, goal):
+    if path[0] != start or path[-1] != goal:
+        return False
+    if any(grid.get_cell(pos) is None for pos in path):
+        return False
+    return all(grid.pos_to_id(b) in grid.get_neighbour_ids(grid.pos_to_id(a))
+               for a, b in zip(path, path[1:]))
+
+
+@pytest.mark.parametrize("selected", ["biBfs", "biAstar"])
+@pytest.mark.parametrize("kind", ["hex", "square"])
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_astar(selected, kind, seed):
+    # dense enough that some seeds have no path at all
+    grid, start, goal = make_scenario(kind, 14, 10, 0.35, seed=seed)
+    result = BidirectionalEngine(grid, start, goal, selected).run()
+    expected = SearchEngine(grid, start, goal, "astar").run()
+    assert result.found == expected.found
+    if expected.found:
+        assert is_valid_path(grid, result.path, start, goal)
+        assert result.path_cost == pytest.approx(expected.path_cost)
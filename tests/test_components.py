@@ -0,0 +1,43 @@
+import random
+import pytest
+from grid import Adjacency, Components
+from scenarios import make_scenario
+
+
+def toggle(grid, pos):
+    if grid.get_cell(pos) is not None:
+        grid.clear_cell(pos)
+    else:
+        grid.new_cell(pos)
+
+
+def same_partition(labels, fresh):
+    # labels may be numbered differently, but each patched label has to
+    # map onto exactly one fresh label and back
+    forward, backward = {}, {}
+    for label, fresh_label in zip(labels, fresh):
+        if (label < 0) != (fresh_label < 0):
+            return False
+        if label < 0:
+            continue
+        if forward.setdefault(label, fresh_label) != fresh_label:
+            return False
+        if backward.setdefault(fresh_label, label) != label:
+            return False
+    return True
+
+
+@pytest.mark.parametrize("backend", ["objects", "array"])
+@pytest.mark.parametrize("kind", ["hex", "square"])
+@pytest.mark.parametrize("seed", range(20))
+def test_patched_labels_match_a_fresh_flood(backend, kind, seed):
+    # dense maps so walls often cut a component in two or join two
+    grid, _, _ = make_scenario(kind, 12, 10, 0.4, seed=seed, backend=backend)
+    rng = random.Random(seed)
+    for _ in range(40):
+        toggle(grid, grid.id_to_pos(rng.randrange(int(grid.get_size()))))
+        components = grid.get_components()
+        adjacency = Adjacency(grid.get_geometric(), grid.get_passable(), grid.MAX_NEIGHBOURS)
+        fresh = Components(adjacency)
+        assert same_partition(components.labels, fresh.labels)
+        assert sorted(components.sizes.values()) == sorted(fresh.sizes.values())
@@ -0,0 +1,66 @@
+import random
+import pytest
+from scenarios import make_scenario
+from search import Node, SearchEngine, SearchObserver, make_frontier
+
+
+class ExpandOrder(SearchObserver):
+    def __init__(self, grid):
+        self.grid = grid
+        self.ids = []
+
+    def on_expand(self, node):
+        self.ids.append(self.grid.pos_to_id(node.pos))
+
+
+def twins(global_cost, estimated_cost, priority):
+    return [Node(None, None, global_cost, estimated_cost, priority) for _ in range(2)]
+
+
+@pytest.mark.parametrize("selected", ["astar", "bestFirst"])
+@pytest.mark.parametrize("seed", range(20))
+def test_bucket_pops_in_heap_order(selected, seed):
+    # the same puts, decrease-keys and gets on both, with whole costs as a
+    # unit cost grid would give them
+    rng = random.Random(seed)
+    frontiers = [make_frontier(selected, "heap"), make_frontier(selected, "bucket")]
+    nodes = {}
+    popped = [[], []]
+    for priority in range(400):
+        action = rng.random()
+        if action < 0.5 or not nodes:
+            key = priority
+            nodes[key] = twins(rng.randrange(20), rng.randrange(20), priority)
+            for frontier, node in zip(frontiers, nodes[key]):
+                frontier.put(key, node)
+        elif action < 0.75:
+            key = rng.choice(list(nodes))
+            step = rng.randrange(1, 4)
+            for frontier, node in zip(frontiers, nodes[key]):
+                node.global_cost = max(0, node.global_cost - step)
+                node.total_cost = node.global_cost + node.estimated_cost
+                frontier.decrease_key(key, node)
+        else:
+            for frontier, order in zip(frontiers, popped):
+                order.append(frontier.get())
+            del nodes[popped[0][-1].priority]
+        tops = [[node.priority for node in frontier.top(5)] for frontier in frontiers]
+        assert tops[0] == tops[1]
+    while frontiers[0].qsize():
+        for frontier, order in zip(frontiers, popped):
+            order.append(frontier.get())
+    assert frontiers[1].qsize() == 0
+    assert [node.priority for node in popped[0]] == [node.priority for node in popped[1]]
+
+
+@pytest.mark.parametrize("selected", ["astar", "bestFirst"])
+@pytest.mark.parametrize("kind", ["hex", "square"])
+@pytest.mark.parametrize("seed", range(10))
+def test_bucket_search_expands_in_heap_order(selected, kind, seed):
+    grid, start, goal = make_scenario(kind, 16, 12, 0.25, seed=seed)
+    orders = []
+    for frontier in ("heap", "bucket"):
+        observer = ExpandOrder(grid)
+        SearchEngine(grid, start, goal, selected, observer, frontier).run()
+        orders.append(observer.ids)
+    assert orders[0] == orders[1]
@@ -0,0 +1,54 @@
+import random
+import pytest
+from hierarchy import HierarchicalMap
+from scenarios import make_scenario
+from search import SearchEngine
+
+
+def check_path(grid, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    for pos in path:
+        assert grid.get_cell(pos) is not None
+    ids = [grid.pos_to_id(pos) for pos in path]
+    for cell_id, next_id in zip(ids, ids[1:]):
+        assert next_id in grid.get_neighbour_ids(cell_id)
+
+
+@pytest.mark.parametrize("kind", ["hex", "square"])
+@pytest.mark.parametrize("cluster_size", [4, 5, 8])
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_flat_astar(kind, cluster_size, seed):
+    grid, _, _ = make_scenario(kind, 30, 24, 0.3, seed=seed)
+    layer = HierarchicalMap(grid, cluster_size)
+    rng = random.Random(seed)
+    open_ids = [cell_id for cell_id, passable in enumerate(grid.get_passable()) if passable]
+    for _ in range(50):
+        start, goal = (grid.id_to_pos(cell_id) for cell_id in rng.sample(open_ids, 2))
+        flat = SearchEngine(grid, start, goal, "astar").run()
+        result = layer.find_path(start, goal)
+        assert result.found == flat.found
+        if flat.found:
+            check_path(grid, result.path, start, goal)
+            # every step costs 1, HPA* paths may be longer but never shorter
+            assert result.path_cost == len(result.path) - 1
+            assert flat.path_cost <= result.path_cost <= 2 * flat.path_cost
+
+
+@pytest.mark.parametrize("kind", ["hex", "square"])
+def test_matches_flat_astar_after_edits(kind):
+    grid, _, _ = make_scenario(kind, 30, 24, 0.3, seed=11)
+    layer = HierarchicalMap(grid, 5)
+    rng = random.Random(11)
+    for _ in range(40):
+        pos = grid.id_to_pos(rng.randrange(int(grid.get_size())))
+        if grid.get_cell(pos) is not None:
+            grid.clear_cell(pos)
+        else:
+            grid.new_cell(pos)
+        layer.cell_changed(grid.pos_to_id(pos))
+        open_ids = [cell_id for cell_id, passable in enumerate(grid.get_passable()) if passable]
+        start, goal = (grid.id_to_pos(cell_id) for cell_id in rng.sample(open_ids, 2))
+        result = layer.find_path(start, goal)
+        assert result.found == SearchEngine(grid, start, goal, "astar").run().found
+        if result.found:
+            check_path(grid, result.path, start, goal)
@@ -0,0 +1,36 @@
+import random
+import pytest
+from incremental import LPAStarEngine
+from scenarios import make_scenario
+from search import SearchEngine
+
+
+def run(engine):
+    while engine.step():
+        pass
+    return engine.result()
+
+
+@pytest.mark.parametrize("kind", ["hex", "square"])
+@pytest.mark.parametrize("seed", range(40))
+def test_repairs_match_a_fresh_search_after_every_edit(kind, seed):
+    grid, start, goal = make_scenario(kind, 12, 10, 0.25, seed=seed)
+    engine = LPAStarEngine(grid, start, goal)
+    run(engine)
+    rng = random.Random(seed)
+    for _ in range(15):
+        pos = grid.id_to_pos(rng.randrange(int(grid.get_size())))
+        if pos in (start, goal):
+            continue
+        if grid.get_cell(pos) is not None:
+            grid.clear_cell(pos)
+        else:
+            grid.new_cell(pos)
+        engine.cell_changed(grid.pos_to_id(pos))
+        repaired = run(engine)
+        fresh = SearchEngine(grid, start, goal, "bfs").run()
+        assert repaired.found == fresh.found
+        if fresh.found:
+            assert all(grid.get_cell(p) is not None for p in repaired.path)
+            assert repaired.path_cost == pytest.approx(
+                SearchEngine(grid, start, goal, "astar").run().path_cost)
@@ -0,0 +1,22 @@
+import pytest
+from jps import JumpPointEngine
+from scenarios import make_scenario
+from search import SearchEngine
+
+
+@pytest.mark.parametrize("backend", ["objects", "array"])
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_astar(backend, seed):
+    grid, start, goal = make_scenario("square", 16, 12, 0.3, seed=seed, backend=backend)
+    result = JumpPointEngine(grid, start, goal, "jps").run()
+    expected = SearchEngine(grid, start, goal, "astar").run()
+    assert result.found == expected.found
+    if expected.found:
+        path = result.path
+        assert path[0] == start and path[-1] == goal
+        assert all(grid.get_cell(pos) is not None for pos in path)
+        # the cells between jump points are filled in, one step at a time
+        assert all(grid.pos_to_id(b) in grid.get_neighbour_ids(grid.pos_to_id(a))
+                   for a, b in zip(path, path[1:]))
+        assert result.path_cost == pytest.approx(expected.path_cost)
+        assert len(path) - 1 == pytest.approx(expected.path_cost)
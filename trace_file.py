@@ -0,0 +1,218 @@
+from __future__ import annotations
+import mmap
+import struct
+import sys
+from array import array
+from grid import HexGrid
+from search import SearchObserver
+
+# binary search traces. A file starts with a header and the map, then
+# holds the events in chunks of keyframe_interval. Each chunk opens with a
+# keyframe, the replay state before its first event, so any event can be
+# reached by loading one keyframe and applying less than a chunk of
+# events. An index of chunk offsets and the event count close the file
+MAGIC = b"PFTRACE1"
+# magic, grid kind, strategy, columns, rows, start id, goal id, keyframe interval
+HEADER = struct.Struct("<8s8s16sIIiiI")
+# kind, cell id, parent id (-1 for none), g cost
+EVENT = struct.Struct("<Biif")
+# event count, chunk count
+TRAILER = struct.Struct("<QQ")
+OFFSET = struct.Struct("<Q")
+
+PUSH, DECREASE, EXPAND, GOAL, EXHAUSTED = 1, 2, 3, 4, 5
+# or'd into the kind for the goal side of a bidirectional search
+BACKWARD = 0x80
+
+# per cell marks in the replay state, what colour the cell is shown in
+OPEN, CLOSED, FOUND = 1, 2, 3
+MARK_BACKWARD = 4
+
+
+def apply_event(marks: bytearray, parents: array, kind: int, cell_id: int,
+                parent_id: int) -> None:
+    backward = MARK_BACKWARD if kind & BACKWARD else 0
+    kind &= ~BACKWARD
+    if kind == PUSH:
+        marks[cell_id] = OPEN | backward
+        parents[cell_id] = parent_id
+    elif kind == DECREASE:
+        parents[cell_id] = parent_id
+    elif kind == EXPAND:
+        marks[cell_id] = CLOSED | backward
+    elif kind == GOAL:
+        marks[cell_id] = FOUND
+    elif kind == EXHAUSTED and cell_id >= 0:
+        marks[cell_id] = CLOSED
+
+
+def to_little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class TraceWriter(SearchObserver):
+    # records search events to path as they happen and passes them on to
+    # observer. Call close() once the search is over
+    def __init__(self, grid, path: str, start, goal, selected: str,
+                 observer: SearchObserver=None, keyframe_interval: int=None) -> None:
+        self.grid = grid
+        self.observer = observer
+        self.start_id = grid.pos_to_id(start)
+        size = int(grid.get_size())
+        # a keyframe costs about as much to load as a few events per cell,
+        # so bigger maps get longer chunks
+        self.keyframe_interval = keyframe_interval or max(1024, size // 16)
+        self.marks = bytearray(size)
+        self.parents = array('i', [-1]) * size
+        self.count = 0
+        self.chunks: list[int] = []
+        self.buffer = bytearray()
+        self.last_parent = None
+        self.last_parent_id = -1
+        self.file = open(path, "wb")
+        kind = b"hex" if isinstance(grid, HexGrid) else b"square"
+        self.file.write(HEADER.pack(MAGIC, kind, selected.encode(), int(grid.cell_num.x),
+                                    int(grid.cell_num.y), self.start_id, grid.pos_to_id(goal),
+                                    self.keyframe_interval))
+        self.file.write(bytes(grid.get_passable()))
+
+    def record(self, kind: int, cell_id: int, parent_id: int=-1, cost: float=0) -> None:
+        if self.file is None:
+            return
+        if self.count % self.keyframe_interval == 0:
+            self.flush()
+            self.chunks.append(self.file.tell())
+            self.file.write(self.marks)
+            self.file.write(to_little_endian(self.parents))
+        self.buffer += EVENT.pack(kind, cell_id, parent_id, cost)
+        apply_event(self.marks, self.parents, kind, cell_id, parent_id)
+        self.count += 1
+
+    def record_node(self, kind: int, node) -> None:
+        grid = self.grid
+        if getattr(node, "backward", False):
+            kind |= BACKWARD
+        parent = node.parent
+        if parent is None:
+            parent_id = -1
+        elif parent is self.last_parent:
+            # pushes come in runs from one expanded node
+            parent_id = self.last_parent_id
+        else:
+            parent_id = self.last_parent_id = grid.pos_to_id(parent.pos)
+            self.last_parent = parent
+        self.record(kind, grid.pos_to_id(node.pos), parent_id, node.global_cost)
+
+    def flush(self) -> None:
+        self.file.write(self.buffer)
+        self.buffer.clear()
+
+    def close(self) -> None:
+        if self.file is None:
+            return
+        self.flush()
+        for offset in self.chunks:
+            self.file.write(OFFSET.pack(offset))
+        self.file.write(TRAILER.pack(self.count, len(self.chunks)))
+        self.file.close()
+        self.file = None
+
+    def on_push(self, node) -> None:
+        self.record_node(PUSH, node)
+        if self.observer is not None:
+            self.observer.on_push(node)
+
+    def on_decrease_key(self, node) -> None:
+        self.record_node(DECREASE, node)
+        if self.observer is not None:
+            self.observer.on_decrease_key(node)
+
+    def on_expand(self, node) -> None:
+        self.record_node(EXPAND, node)
+        if self.observer is not None:
+            self.observer.on_expand(node)
+
+    def on_goal(self, node) -> None:
+        # engines can rewrite parents as they finish, LPA* walks back along
+        # the cheapest neighbours and bidirectional joins its two trees, so
+        # the final path goes in as decrease events first
+        grid = self.grid
+        path = node
+        for _ in range(len(self.parents)):
+            if path is None or path.parent is None:
+                break
+            cell_id, parent_id = grid.pos_to_id(path.pos), grid.pos_to_id(path.parent.pos)
+            if self.parents[cell_id] != parent_id:
+                self.record(DECREASE, cell_id, parent_id, path.global_cost)
+            path = path.parent
+        self.record_node(GOAL, node)
+        if self.observer is not None:
+            self.observer.on_goal(node)
+
+    def on_exhausted(self) -> None:
+        self.record(EXHAUSTED, self.start_id)
+        if self.observer is not None:
+            self.observer.on_exhausted()
+
+
+class TraceReader:
+    # memory maps a trace file, only the pages that are read are loaded
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, kind, selected, self.columns, self.rows, self.start_id, self.goal_id,
+         self.keyframe_interval) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a search trace")
+        self.kind = kind.rstrip(b"\0").decode()
+        self.selected = selected.rstrip(b"\0").decode()
+        self.size = self.columns * self.rows
+        self.keyframe_size = self.size * 5
+        self.count, chunk_count = TRAILER.unpack_from(self.data, len(self.data) - TRAILER.size)
+        index = len(self.data) - TRAILER.size - chunk_count * OFFSET.size
+        self.chunks = [OFFSET.unpack_from(self.data, index + i * OFFSET.size)[0]
+                       for i in range(chunk_count)]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def passable(self) -> list[bool]:
+        # indexed by cell id
+        return [bool(value) for value in self.data[HEADER.size:HEADER.size + self.size]]
+
+    def event(self, index: int) -> tuple[int, int, int, float]:
+        interval = self.keyframe_interval
+        offset = self.chunks[index // interval] + self.keyframe_size
+        return EVENT.unpack_from(self.data, offset + index % interval * EVENT.size)
+
+    def events(self, start: int, stop: int):
+        # (kind, cell id, parent id, cost) for events start to stop - 1
+        data = self.data
+        interval = self.keyframe_interval
+        for chunk in range(start // interval, -(-stop // interval)):
+            base = self.chunks[chunk] + self.keyframe_size
+            first = max(start, chunk * interval) - chunk * interval
+            last = min(stop, (chunk + 1) * interval) - chunk * interval
+            yield from EVENT.iter_unpack(data[base + first * EVENT.size:base + last * EVENT.size])
+
+    def state_at(self, index: int) -> tuple[bytearray, array]:
+        # marks and parents after the first index events
+        chunk = min(index // self.keyframe_interval, len(self.chunks) - 1)
+        if chunk < 0:
+            return bytearray(self.size), array('i', [-1]) * self.size
+        offset = self.chunks[chunk]
+        marks = bytearray(self.data[offset:offset + self.size])
+        parents = array('i')
+        parents.frombytes(self.data[offset + self.size:offset + self.keyframe_size])
+        if sys.byteorder == "big":
+            parents.byteswap()
+        for kind, cell_id, parent_id, _ in self.events(chunk * self.keyframe_interval, index):
+            apply_event(marks, parents, kind, cell_id, parent_id)
+        return marks, parents
+
+    def close(self) -> None:
+        self.data.close()
+        self.file.close()
@@ -0,0 +1,186 @@
+from __future__ import annotations
+from math import cos, pi
+import pygame as pg
+from agents import AStar
+from player import Player, Goal
+from search import SearchTree
+from trace_file import BACKWARD, EXHAUSTED, EXPAND, GOAL, TraceReader, apply_event
+
+# marks are compared this many cells at a time when seeking, so the cells
+# that did not change are skipped without a python loop
+BLOCK = 4096
+
+
+def make_grid(reader: TraceReader, area: pg.Rect):
+    # an array grid the size of the traced map, scaled to fit area
+    from array_grid import ArrayHexGrid, ArraySquareGrid
+    cell_num = pg.Vector2(reader.columns, reader.rows)
+    center = pg.Vector2(area.center)
+    if reader.kind == "hex":
+        size = min(area.width / (0.75 * reader.columns + 0.25),
+                   area.height / (cos(pi/6) * (reader.rows + 0.5)))
+        grid = ArrayHexGrid(cell_num, center, size=size)
+    else:
+        size = min(area.width / reader.columns, area.height / reader.rows)
+        grid = ArraySquareGrid(cell_num, center, size=pg.Vector2(size, size))
+    grid.load_map(reader.passable())
+    return grid
+
+
+class TraceReplay:
+    # plays a recorded search back on grid. Playback runs at speed events a
+    # second and seek() jumps straight to any event: the reader loads the
+    # keyframe before it and only the cells that differ are repainted
+    SPEEDS = (1, 1 << 20)
+
+    def __init__(self, screen, reader: TraceReader, grid, key_interval: int=150,
+                 speed: int=60) -> None:
+        self.screen = screen
+        self.reader = reader
+        self.grid = grid
+        self.interval = key_interval
+        self.lastTime = {pg.K_SPACE: 0, pg.K_LEFT: 0, pg.K_RIGHT: 0,
+                         pg.K_LEFTBRACKET: 0, pg.K_RIGHTBRACKET: 0,
+                         pg.K_COMMA: 0, pg.K_PERIOD: 0}
+        self.speed = speed
+        self.playing = False
+        # fraction of an event carried over between frames
+        self.pending = 0.0
+
+        self.start = grid.id_to_pos(reader.start_id)
+        self.goal = grid.id_to_pos(reader.goal_id)
+        self.player = Player(screen, self.start, grid.pos_to_coords(self.start), pg.Color("red"))
+        self.target = Goal(screen, self.goal, pg.Color("blue"))
+        width, height = screen.get_size()
+        self.bar = pg.Rect(20, height - 84, width - 40, 10)
+
+        grid.reset()
+        self.marks = bytearray(reader.size)
+        self.tree = SearchTree(reader.size)
+        grid.search_trees = (self.tree,)
+        self.index = 0
+        # the last expanded cell and its g, the trail is drawn back from it
+        self.current = -1
+        self.cost = 0.0
+
+    def __len__(self) -> int:
+        return len(self.reader)
+
+    def paint(self, cell_ids) -> None:
+        groups: dict[int, list[int]] = {}
+        for cell_id in cell_ids:
+            groups.setdefault(self.marks[cell_id], []).append(cell_id)
+        for mark, ids in groups.items():
+            self.grid.set_highlights(ids, AStar.MARK_COLOURS.get(mark, self.grid.colour))
+
+    def find_current(self) -> None:
+        # events after an expansion are its pushes, so this is a short walk
+        self.current, self.cost = -1, 0.0
+        for index in range(self.index - 1, -1, -1):
+            kind, cell_id, _, cost = self.reader.event(index)
+            if kind == EXHAUSTED:
+                return
+            if kind & ~BACKWARD in (EXPAND, GOAL):
+                self.current, self.cost = cell_id, cost
+                return
+
+    def seek(self, index: int) -> None:
+        index = max(0, min(index, len(self)))
+        marks, parents = self.reader.state_at(index)
+        changed = []
+        old = self.marks
+        for start in range(0, len(marks), BLOCK):
+            stop = start + BLOCK
+            if marks[start:stop] != old[start:stop]:
+                changed.extend(cell_id for cell_id in range(start, min(stop, len(marks)))
+                               if marks[cell_id] != old[cell_id])
+        self.marks = marks
+        self.tree.parent = parents
+        self.index = index
+        self.paint(changed)
+        self.find_current()
+
+    def advance(self, count: int) -> None:
+        # whole chunks are quicker to jump over than to play
+        stop = min(self.index + count, len(self))
+        if stop - self.index > self.reader.keyframe_interval:
+            self.seek(stop)
+            return
+        touched = []
+        for kind, cell_id, parent_id, cost in self.reader.events(self.index, stop):
+            apply_event(self.marks, self.tree.parent, kind, cell_id, parent_id)
+            if cell_id >= 0:
+                touched.append(cell_id)
+            if kind & ~BACKWARD in (EXPAND, GOAL):
+                self.current, self.cost = cell_id, cost
+            elif kind == EXHAUSTED:
+                self.current, self.cost = -1, 0.0
+        self.index = stop
+        self.paint(touched)
+
+    def progress(self) -> float:
+        return self.index / len(self) if len(self) else 1.0
+
+    def check_keys(self) -> None:
+        keys = pg.key.get_pressed()
+        ticks = pg.time.get_ticks()
+        pressed = {key for key in self.lastTime
+                   if keys[key] and ticks > self.interval + self.lastTime[key]}
+        for key in pressed:
+            self.lastTime[key] = ticks
+
+        if pg.K_SPACE in pressed:
+            if self.index == len(self):
+                self.seek(0)
+            self.playing = not self.playing
+        if pg.K_LEFT in pressed:
+            self.playing = False
+            self.seek(self.index - 1)
+        if pg.K_RIGHT in pressed:
+            self.playing = False
+            self.advance(1)
+        if pg.K_LEFTBRACKET in pressed:
+            self.speed = max(self.SPEEDS[0], self.speed // 2)
+        if pg.K_RIGHTBRACKET in pressed:
+            self.speed = min(self.SPEEDS[1], self.speed * 2)
+        if pg.K_COMMA in pressed:
+            self.seek(self.index - max(1, len(self) // 20))
+        if pg.K_PERIOD in pressed:
+            self.seek(self.index + max(1, len(self) // 20))
+        if keys[pg.K_HOME]:
+            self.seek(0)
+        if keys[pg.K_END]:
+            self.seek(len(self))
+        for digit in range(10):
+            if keys[pg.K_0 + digit]:
+                self.seek(len(self) * digit // 10)
+
+        if pg.mouse.get_pressed()[0]:
+            x, y = pg.mouse.get_pos()
+            if self.bar.inflate(0, 10).collidepoint(x, y):
+                self.seek(round((x - self.bar.x) / self.bar.width * len(self)))
+
+    def draw_progress(self, screen) -> None:
+        pg.draw.rect(screen, (60, 60, 80), self.bar)
+        done = self.bar.copy()
+        done.width = round(self.bar.width * self.progress())
+        pg.draw.rect(screen, (255, 0, 0), done)
+
+    def update(self, screen, dt) -> None:
+        self.check_keys()
+        if self.playing:
+            self.pending += self.speed * dt / 1000
+            count = int(self.pending)
+            self.pending -= count
+            if count:
+                self.advance(count)
+            if self.index == len(self):
+                self.playing = False
+
+        self.grid.draw(screen)
+        if self.current >= 0:
+            for cell_id in self.tree.path_ids(self.current):
+                self.grid.draw_trail(screen, self.grid.id_to_pos(cell_id))
+        self.player.draw(self.grid.pos_to_coords(self.start))
+        self.target.draw(self.grid.pos_to_coords(self.goal))
+        self.draw_progress(screen)